@@ -0,0 +1,71 @@
+""" Binomials.py
+
+One Pascal triangle shared by everything that counts deals.
+
+Every counter keeps asking for the same few hundred binomial coefficients
+(a region of n tiles giving x of them to a hand), millions of times over a
+game. The triangle is grown lazily a row at a time by adding up the row
+above it, so every coefficient is worked out once per process and after
+that it's a list lookup. Rows are plain lists, so hot loops can fetch
+row(n) once and index it instead of calling comb for every x.
+
+The log rows hold log(comb(n, x)) for the log-space counting, worked out
+from the exact ints so they're as close as a float gets.
+
+Growing happens under a lock, so counters running in threads can share
+the triangle. Reading a row that's already there doesn't take it.
+"""
+
+import math
+import threading
+
+_rows: list[list[int]] = [[1]]
+_log_rows: list[list[float]] = [[0.0]]
+_lock = threading.Lock()
+
+
+def _grow(n: int):
+    # Another thread may have grown it while this one waited, so the
+    # length is checked again under the lock
+    with _lock:
+        while len(_rows) <= n:
+            above = _rows[-1]
+            _rows.append([1] + [a + b for a, b in zip(above, above[1:])] + [1])
+
+
+def row(n: int) -> list[int]:
+    """ Returns [comb(n, 0), ..., comb(n, n)]. Don't modify it, it's the
+    shared row. """
+    if n >= len(_rows):
+        _grow(n)
+    return _rows[n]
+
+
+def comb(n: int, x: int) -> int:
+    """ Same as math.comb(n, x) (0 when x > n), out of the shared triangle """
+    if x < 0 or n < 0:
+        raise ValueError("comb needs non-negative arguments")
+    if x > n:
+        return 0
+    if n >= len(_rows):
+        _grow(n)
+    return _rows[n][x]
+
+
+def log_row(n: int) -> list[float]:
+    """ Returns [log(comb(n, 0)), ..., log(comb(n, n))] """
+    if n >= len(_log_rows):
+        row(n)
+        with _lock:
+            while len(_log_rows) <= n:
+                _log_rows.append([math.log(ways) for ways in _rows[len(_log_rows)]])
+    return _log_rows[n]
+
+
+def log_comb(n: int, x: int) -> float:
+    """ log(comb(n, x)), -inf when x > n """
+    if x < 0 or n < 0:
+        raise ValueError("log_comb needs non-negative arguments")
+    if x > n:
+        return -math.inf
+    return log_row(n)[x]
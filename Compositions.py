@@ -0,0 +1,73 @@
+""" Compositions.py
+
+Every way to take a fixed number of items out of groups of limited size.
+
+A hand that can reach sets of sizes (2, 3, 1) and needs 4 more tiles can
+take (0, 3, 1), (1, 2, 1), (1, 3, 0), (2, 1, 1), (2, 2, 0): the bounded
+compositions of 4. Every position asks for the same few (sizes, total)
+pairs again and again, so the answers are memoised on them, and suffixes
+that can't reach the total with what's left are never walked.
+
+iter_compositions is the walk itself. It's a loop over one list instead
+of a recursion, so it doesn't care how many groups there are and doesn't
+build a new list per result.
+"""
+
+from typing import Iterator
+
+type Composition = tuple[int, ...]
+
+_memo: dict[tuple[tuple[int, ...], int], tuple[Composition, ...]] = {}
+
+
+def iter_compositions(sizes, total: int) -> Iterator[list[int]]:
+    """ Yields every [x_0, ..., x_n-1] with 0 <= x_i <= sizes[i] that adds
+    up to total, in lexicographic order
+
+    Every result is the same list, changed in place for the next one, so
+    copy it (tuple(...)) to keep it. Moving on from a result only rewrites
+    the positions after the one that changed: x_i is bumped at the
+    rightmost place it still can be and everything after it starts over
+    at the least it can be, which is what the groups after it can't hold.
+    So no prefix that can't reach the total is ever tried.
+    """
+    n = len(sizes)
+    # capacity[i] is how much groups i and up can hold, left[i] is how
+    # much of the total is still to go before group i takes its share
+    capacity = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        capacity[i] = capacity[i + 1] + sizes[i]
+    if not 0 <= total <= capacity[0]:
+        return
+    picked = [0] * n
+    left = [0] * (n + 1)
+    left[0] = total
+    start = 0
+    while True:
+        for i in range(start, n):
+            least = left[i] - capacity[i + 1]
+            picked[i] = least if least > 0 else 0
+            left[i + 1] = left[i] - picked[i]
+        yield picked
+        # The last group always takes whatever's left, so it never moves
+        i = n - 2
+        while i >= 0 and (picked[i] == sizes[i] or picked[i] == left[i]):
+            i -= 1
+        if i < 0:
+            return
+        picked[i] += 1
+        left[i + 1] -= 1
+        start = i + 1
+
+
+def bounded_compositions(sizes, total: int) -> tuple[Composition, ...]:
+    """ Every (x_0, ..., x_n-1) with 0 <= x_i <= sizes[i] that adds up to
+    total, in lexicographic order. Always as long as sizes. """
+    key = (tuple(sizes), total)
+    if key not in _memo:
+        _memo[key] = tuple(map(tuple, iter_compositions(key[0], total)))
+    return _memo[key]
+
+
+def clear_memo():
+    _memo.clear()
@@ -0,0 +1,921 @@
+""" Counts the ways the unknown dominoes can be dealt to the other hands
+
+A region is a group of tiles that the same set of hands could be holding.
+It's keyed by an owner mask where bit i means hand i could hold the tile,
+so for three hands 0b001 is "only hand 0" and 0b111 is "anyone".
+
+A deal gives hand i exactly hand_sizes[i] tiles, all from regions whose
+mask has bit i set, and no tile goes to two hands. Tiles inside a region
+are interchangeable for counting, so a region of n tiles shared by owners
+S contributes the polynomial (1 + sum of z_i for i in S)^n and the number
+of deals is the coefficient of z^hand_sizes in the product of those.
+
+DealCounter pulls that coefficient out one region and one owner at a time,
+memoised on how many tiles each hand still needs, instead of nesting one
+loop for every hand/region pair like count_non_overlapping_combinations_3hands2
+used to. It works for any number of hands, with up to 2^N - 1 regions.
+"""
+
+import math
+import operator
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from fractions import Fraction
+from typing import Iterator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from Binomials import log_row, row
+
+type RegionSizes = dict[int, int]
+type HandSizes = tuple[int, ...]
+type ValueCounts = dict[int, tuple[int, ...]]
+
+# "exact" counts with Python ints, "float" with float64, which rounds once
+# counts get big. NumPy is optional: when it's installed the float and log
+# vectors are NumPy arrays, which is where most of their speedup over
+# exact comes from. Without it they're plain float lists, still free of big ints
+# (the weights come from the log binomials, see _RegionSteps), which only
+# pays off once the counts outgrow a machine word: about even with exact on
+# double six, about a third faster on double twelve.
+# "log" returns the natural log of every count instead. While counting,
+# each table keeps its counts as floats next to one log scale for the
+# whole table, rescaled after every region, and the weights come from the
+# log binomials, so nothing overflows or turns into a huge int however
+# many tiles there are (double nine, double twelve) and the inner loop is
+# the float one. Counts and the ratios between them come back within
+# LOG_RELATIVE_ERROR of the exact ones; a count under about 1e-300 of the
+# biggest one in its table comes back as no deals at all.
+PRECISIONS = ("exact", "float", "log")
+LOG_RELATIVE_ERROR = 1e-9
+
+
+def owners_of(mask: int, hand_count: int) -> list[int]:
+    """ Returns the hand indices that are set in the owner mask """
+    return [i for i in range(hand_count) if mask >> i & 1]
+
+
+def region_splits(size: int, room: list[int], log: bool = False,
+                  least: list[int] | None = None) -> Iterator[tuple[tuple[int, ...], int]]:
+    """ Yields every way a region of `size` tiles can give x_j tiles to
+    owner j (least[j] <= x_j <= room[j], sum of x_j <= size) along with
+    the number of ways to pick the actual tiles for that split, or its
+    natural log when `log` is set (added up from the log binomials, no
+    big ints) """
+    if not room:
+        yield (), 0.0 if log else 1
+        return
+    binomials = log_row(size) if log else row(size)
+    lowest = max(least[0], 0) if least else 0
+    for x in range(lowest, min(size, room[0]) + 1):
+        ways = binomials[x]
+        for rest, rest_ways in region_splits(size - x, room[1:], log,
+                                             least[1:] if least else None):
+            yield (x,) + rest, ways + rest_ways if log else ways * rest_ways
+
+
+def region_masks(hand_count: int) -> list[int]:
+    """ Returns the owner mask of every region for the given number of
+    hands, 2^hand_count - 1 of them """
+    return list(range(1, 1 << hand_count))
+
+
+def regions_from_graph(graph, hand_names: list[str]) -> RegionSizes:
+    """ Converts the sets of a VennGraph/BitmaskVennGraph into the owner
+    mask -> size dict DealCounter uses. Hand i is hand_names[i]. """
+    bits = {name: 1 << i for i, name in enumerate(hand_names)}
+    regions = {}
+    for set_name in graph.sets:
+        mask = 0
+        for name in set_name:
+            mask |= bits[name]
+        regions[mask] = graph.size(True, *set_name)
+    return regions
+
+
+class DealCounter:
+    """ Counts deals of a fixed region layout into any number of hands
+
+    Regions are walked smallest first and every region hands its tiles to
+    its owners one owner at a time, so instead of one loop per region (or
+    per region split) there's a single recursion memoised on where it is
+    and how many tiles each hand still needs. The biggest region (usually
+    the one everybody shares) goes last, where the split is forced and
+    costs one multinomial. The memo only depends on the layout, so one
+    counter can be asked about many hand sizes.
+    """
+
+    def __init__(self, region_sizes: RegionSizes, hand_count: int,
+                 order: list[int] = None):
+        """ `order` pins the regions to a fixed order of owner masks (empty
+        ones included) so they can be resized later, see resize """
+        self.hand_count = hand_count
+        if order is None:
+            order = [mask for mask, size in sorted(region_sizes.items(),
+                                                   key=lambda item: (item[1], item[0]))
+                     if mask and size]
+        elif any(mask and size and mask not in order
+                 for mask, size in region_sizes.items()):
+            raise ValueError("Every region needs a place in the order")
+        self.regions: list[tuple[int, int, list[int]]] = [
+            (mask, region_sizes.get(mask, 0), owners_of(mask, hand_count))
+            for mask in order
+        ]
+        self._index: dict[int, int] = {
+            mask: k for k, (mask, _, _) in enumerate(self.regions)}
+        # One memo per region so a resize only throws away what it touched
+        self._memo: list[dict[tuple, int]] = [{} for _ in self.regions]
+        self._update_capacity()
+
+    def _update_capacity(self):
+        # capacity_after[k][i] is how many tiles hand i could still get from
+        # the regions after region k, tiles_after[k] is how many tiles
+        # those regions hold in total.
+        self.capacity_after: list[tuple[int, ...]] = []
+        self.tiles_after: list[int] = []
+        capacity = [0] * self.hand_count
+        tiles = 0
+        for mask, size, owners in reversed(self.regions):
+            self.capacity_after.append(tuple(capacity))
+            self.tiles_after.append(tiles)
+            for i in owners:
+                capacity[i] += size
+            tiles += size
+        self.capacity_after.reverse()
+        self.tiles_after.reverse()
+        self.capacity: tuple[int, ...] = tuple(capacity)
+        self.valid = all(size >= 0 for _, size, _ in self.regions)
+
+    def size(self, mask: int) -> int:
+        """ Returns the number of tiles in the region """
+        k = self._index.get(mask)
+        return 0 if k is None else self.regions[k][1]
+
+    def resize(self, mask: int, size: int):
+        """ Changes the size of one region. Memoised counts for the regions
+        after it don't depend on it, so only the ones up to it are dropped """
+        k = self._index[mask]
+        if self.regions[k][1] == size:
+            return
+        self.regions[k] = (mask, size, self.regions[k][2])
+        for memo in self._memo[:k + 1]:
+            memo.clear()
+        self._update_capacity()
+
+    def count(self, hand_sizes: HandSizes) -> int:
+        """ Returns the number of ways to deal the regions into the hands """
+        if not self.valid or any(size < 0 for size in hand_sizes) or \
+                any(need > cap for need, cap in zip(hand_sizes, self.capacity)):
+            return 0
+        if not self.regions:
+            return int(not any(hand_sizes))
+        return self.completions(0, 0, self.regions[0][1], tuple(hand_sizes))
+
+    def completions(self, k: int, j: int, left: int, remaining: HandSizes) -> int:
+        """ Number of ways to finish the deal when owner j of region k is
+        next to pick, region k has `left` tiles that nobody took yet and
+        hand i still needs remaining[i] tiles """
+        memo = self._memo[k]
+        key = (j, left, remaining)
+        if key in memo:
+            return memo[key]
+
+        mask, size, owners = self.regions[k]
+        if k + 1 == len(self.regions):
+            total = self._last_region_ways(owners[j:], left, remaining)
+            memo[key] = total
+            return total
+        if j == len(owners):
+            total = self.completions(k + 1, 0, self.regions[k + 1][1], remaining)
+            memo[key] = total
+            return total
+
+        # Tiles nobody takes are left over for good, so bail out as soon as
+        # there aren't enough tiles left to fill the hands
+        needed = sum(remaining)
+        if needed > left + self.tiles_after[k]:
+            memo[key] = 0
+            return 0
+
+        i = owners[j]
+        need = remaining[i]
+        # Hand i has to finish here if later regions can't cover it, and
+        # the last owner has to take whatever the later regions can't hold
+        lowest = max(0, need - self.capacity_after[k][i])
+        if j + 1 == len(owners):
+            lowest = max(lowest, needed - self.tiles_after[k])
+        total = 0
+        binomials = row(left)
+        for x in range(lowest, min(left, need) + 1):
+            next_remaining = remaining[:i] + (need - x,) + remaining[i + 1:]
+            total += binomials[x] * \
+                self.completions(k, j + 1, left - x, next_remaining)
+        memo[key] = total
+        return total
+
+    def _last_region_ways(self, owners: list[int], left: int, remaining: HandSizes) -> int:
+        """ The last region has to cover whatever the hands still need, so
+        there's only one split left for the owners that haven't picked yet
+        and its ways are a multinomial """
+        ways = 1
+        for i, need in enumerate(remaining):
+            if not need:
+                continue
+            if i not in owners or need > left:
+                return 0
+            ways *= row(left)[need]
+            left -= need
+        return ways
+
+    def region_split_counts(self, hand_sizes: HandSizes) -> dict[int, dict[tuple[int, ...], int]]:
+        """ For every region, how many deals split it each possible way
+
+        Returns mask -> split -> deals, where split[j] is how many tiles
+        the region's j-th owner (lowest bit first) gets. One forward pass
+        keeps the tables of ways to deal the regions before each one, and
+        the memoised completions give the ways to deal the ones after it,
+        so every split is weighed without re-counting per tile. Everything
+        about who holds what inside a region follows from these, since
+        the tiles in a region are interchangeable.
+        """
+        hand_sizes = tuple(hand_sizes)
+        splits: dict[int, dict[tuple[int, ...], int]] = {
+            mask: {} for mask, _, _ in self.regions}
+        if not self.count(hand_sizes):
+            return splits
+
+        table = {tuple([0] * self.hand_count): 1}
+        for k, (mask, size, owners) in enumerate(self.regions):
+            next_table = {}
+            for filled, count in table.items():
+                room = [hand_sizes[i] - filled[i] for i in owners]
+                for split, ways in region_splits(size, room):
+                    new_filled = list(filled)
+                    for i, x in zip(owners, split):
+                        new_filled[i] += x
+                    new_filled = tuple(new_filled)
+                    remaining = tuple(need - got for need, got in zip(hand_sizes, new_filled))
+                    if k + 1 == len(self.regions):
+                        after = int(not any(remaining))
+                    else:
+                        after = self.completions(k + 1, 0, self.regions[k + 1][1], remaining)
+                    if not after:
+                        continue
+                    splits[mask][split] = splits[mask].get(split, 0) + count * ways * after
+                    next_table[new_filled] = next_table.get(new_filled, 0) + count * ways
+            table = next_table
+        return splits
+
+    def states(self) -> int:
+        """ Number of memoised states, used by the benchmarks """
+        return sum(len(memo) for memo in self._memo)
+
+
+def count_deals(region_sizes: RegionSizes, hand_sizes: HandSizes,
+                precision: str = "exact"):
+    """ Returns the number of ways to deal the regions into the hands, or
+    its log with precision "log"
+
+    Tiles that don't end up in a hand are left over (boneyard), so when the
+    hand sizes add up to every tile in play each deal uses all of them.
+    """
+    if precision == "exact":
+        return DealCounter(region_sizes, len(hand_sizes)).count(hand_sizes)
+    return count_value_deals(region_sizes, {}, hand_sizes, precision)[0]
+
+
+def _log(count) -> float:
+    return math.log(count) if count else -math.inf
+
+
+def _log_add(a: float, b: float) -> float:
+    """ log(exp(a) + exp(b)) without leaving log space """
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
+def log_subtract(a: float, b: float) -> float:
+    """ log(exp(a) - exp(b)) for b <= a, -inf when they're equal """
+    if b >= a:
+        return -math.inf
+    return a + math.log1p(-math.exp(b - a))
+
+
+def from_exact(count: int, precision: str):
+    """ An exact count in the given precision's representation """
+    if precision == "exact":
+        return count
+    return float(count) if precision == "float" else _log(count)
+
+
+def ratio(part, total, precision: str):
+    """ part / total for two counts in the given precision, a Fraction
+    when exact. 0 when there are no deals at all. """
+    if precision == "log":
+        return math.exp(part - total) if total != -math.inf else 0.0
+    if not total:
+        return Fraction(0) if precision == "exact" else 0.0
+    return Fraction(part, total) if precision == "exact" else part / total
+
+
+def _vector_ops(precision: str, length: int):
+    """ zero(), multiply_add(acc, counts, weights) and as_vector(weights)
+    for count vectors
+
+    Log vectors are float vectors too: every table keeps its counts as
+    floats next to one log scale for the whole table (see _RegionSteps),
+    so adding two counts is a float add instead of a log-sum-exp.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}")
+    if precision != "exact" and np is not None:
+        def zero():
+            return np.zeros(length)
+
+        def multiply_add(acc, counts, weights):
+            acc += counts * weights
+            return acc
+
+        return zero, multiply_add, lambda weights: np.array(weights, dtype=float)
+
+    def zero():
+        return [0] * length
+
+    def multiply_add(acc, counts, weights):
+        return [total + count * weight
+                for total, count, weight in zip(acc, counts, weights)]
+
+    return zero, multiply_add, (list if precision == "exact"
+                                else lambda weights: [float(w) for w in weights])
+
+
+def _rescale(table: dict) -> float:
+    """ Divides a log table's counts by its biggest total so they stay in
+    float range, returning the log of what was taken out """
+    top = max((counts if isinstance(counts, float) else counts[0]
+               for counts in table.values()), default=0.0)
+    if not top:
+        return 0.0
+    for filled, counts in table.items():
+        table[filled] = [count / top for count in counts] if isinstance(counts, list) \
+            else counts / top
+    return math.log(top)
+
+
+def _unscale(count, scale: float, precision: str):
+    """ A count from a table with the given log scale, in the precision """
+    return scale + _log(count) if precision == "log" else count
+
+
+class _RegionSteps:
+    """ The splits of one region, listed once per room (what its owners can
+    still take) as steps to add to a hand fill, with their weights
+
+    Splits and weights only depend on the region, so one of these can be
+    shared by every table entry and by other layouts with the same region.
+    Exact weights are ints. Float and log ones come out of the log
+    binomials (see Binomials.log_row), so no big int is ever built for
+    them: a log table's counts are floats times e^scale, and this region's
+    weights are taken relative to e^self.scale, the most ways any split
+    of it can have, which keeps every one of them in float range.
+    """
+
+    def __init__(self, size: int, owners: list[int], values: tuple[int, ...],
+                 hand_count: int, value_count: int, precision: str):
+        self.size = size
+        self.owners = owners
+        self.values = values
+        self.hand_count = hand_count
+        self.value_count = value_count
+        self.precision = precision
+        self.scale = size * math.log(len(owners) + 1) if precision == "log" else 0.0
+        self._as_vector = _vector_ops(precision, 1 + hand_count * value_count)[2]
+        rows = row if precision == "exact" else log_row
+        self._binomials = rows(size)
+        self._avoid_rows = [rows(size - with_value) for with_value in values]
+        self._steps: dict[tuple, list] = {}
+        self._weights: dict[tuple[int, ...], tuple] = {}
+
+    def __call__(self, room: tuple[int, ...], reach: tuple[int, ...]) -> list:
+        """ (step, tiles taken, split, channel weights, ways) for every
+        split that fits the room and leaves each owner j no more than
+        reach[j] short, reach being what the other regions can still give
+        them. Only those get weighed. """
+        key = (room, reach)
+        steps = self._steps.get(key)
+        if steps is None:
+            least = [need - can for need, can in zip(room, reach)]
+            steps = []
+            for split, ways in region_splits(self.size, list(room),
+                                             self.precision != "exact", least):
+                step = [0] * self.hand_count
+                for i, x in zip(self.owners, split):
+                    step[i] = x
+                if split not in self._weights:
+                    self._weights[split] = self._weigh(split, ways)
+                steps.append((tuple(step), sum(split), split) + self._weights[split])
+            self._steps[key] = steps
+        return steps
+
+    def _weigh(self, split, ways):
+        """ For a region of n tiles, m of them with value v, ways * C(n - m,
+        x_i) / C(n, x_i) of a split's picks keep v out of hand i """
+        value_count = self.value_count
+        weight = [ways if self.precision == "exact" else math.exp(ways - self.scale)] * \
+            (1 + self.hand_count * value_count)
+        binomials = self._binomials
+        for i, x in zip(self.owners, split):
+            for v, avoid in enumerate(self._avoid_rows):
+                if x >= len(avoid):
+                    weight[1 + i * value_count + v] = 0
+                elif self.precision == "exact":
+                    weight[1 + i * value_count + v] = ways * avoid[x] // binomials[x]
+                else:
+                    weight[1 + i * value_count + v] = \
+                        weight[0] * math.exp(avoid[x] - binomials[x])
+        return self._as_vector(weight), weight[0]
+
+
+def _region_steps(shared: dict, counter: DealCounter, k: int, value_counts: ValueCounts,
+                  hand_count: int, value_count: int, precision: str) -> _RegionSteps:
+    mask, size, owners = counter.regions[k]
+    values = tuple(value_counts.get(mask, ()))
+    key = (precision, hand_count, value_count, size, tuple(owners), values)
+    if key not in shared:
+        shared[key] = _RegionSteps(size, owners, values, hand_count, value_count, precision)
+    return shared[key]
+
+
+def _completion_tables(counter: DealCounter, hand_sizes: HandSizes, precision: str,
+                       shared: dict | None = None) -> dict[int, tuple[dict, float]]:
+    """ k -> (fill -> ways to deal regions k to the end that take hands
+    holding `fill` to exactly hand_sizes, log scale of the table), for
+    k = 1 up to the number of regions (where the only way is dealing
+    nothing)
+
+    It's the deal count walked from the last region back, so every entry
+    is worked out once and in the precision that was asked for. Fills the
+    regions before k couldn't have dealt are skipped.
+    """
+    hand_count = len(hand_sizes)
+    if shared is None:
+        shared = {}
+    regions = len(counter.regions)
+    # Keyed on what the hands still need while walking back
+    table = {tuple([0] * hand_count): 1 if precision == "exact" else 1.0}
+    scale = 0.0
+    tables = {regions: ({tuple(hand_sizes): table[tuple([0] * hand_count)]}, scale)}
+    tiles_before = sum(size for _, size, _ in counter.regions)
+    for k in range(regions - 1, 0, -1):
+        if not counter.regions[k][1]:
+            # An empty region deals nothing (counters with a pinned order
+            # keep them)
+            tables[k] = tables[k + 1]
+            continue
+        steps = _region_steps(shared, counter, k, {}, hand_count, 0, precision)
+        tiles_before -= steps.size
+        capacity_before = [cap - after - (steps.size if i in steps.owners else 0)
+                           for i, (cap, after) in enumerate(zip(counter.capacity,
+                                                                 counter.capacity_after[k]))]
+        least = tuple(need - cap for need, cap in zip(hand_sizes, capacity_before))
+        least_total = sum(hand_sizes) - tiles_before
+        reach = tuple(capacity_before[i] for i in steps.owners)
+        others = [i for i in range(hand_count) if i not in steps.owners]
+        next_table = {}
+        for remaining, count in table.items():
+            if any(remaining[i] < least[i] for i in others):
+                continue
+            room = tuple(hand_sizes[i] - remaining[i] for i in steps.owners)
+            short = least_total - sum(remaining)
+            for step, taken, _, _, ways in steps(room, reach):
+                if taken < short:
+                    continue
+                new_remaining = tuple(map(operator.add, remaining, step))
+                next_table[new_remaining] = next_table.get(new_remaining, 0) + count * ways
+        table = next_table
+        scale += steps.scale
+        if precision == "log":
+            scale += _rescale(table)
+        tables[k] = ({tuple(map(operator.sub, hand_sizes, remaining)): count
+                      for remaining, count in table.items()}, scale)
+    return tables
+
+
+def count_value_deals(region_sizes: RegionSizes, value_counts: ValueCounts,
+                      hand_sizes: HandSizes, precision: str = "exact",
+                      with_zones: bool = False):
+    """ Counts the deals and, in the same pass, the deals where hand i has
+    no tile with value v, for every hand and value
+
+    value_counts[mask][v] is how many tiles in that region have value v.
+    Every DP entry carries one count per (hand, value) next to the total.
+    For a region of n tiles, m of them with value v, a split that gives
+    x_i tiles to hand i can be picked in `ways` ways, and
+    ways * C(n - m, x_i) / C(n, x_i) of those keep v out of hand i, so
+    every channel is the same walk with a different weight per split.
+
+    Returns (total, avoided) with avoided[i][v] the deals where hand i has
+    nothing with value v, or their logs with precision "log".
+
+    with_zones adds a third item, held[mask][i][x]: the deals where hand
+    i gets exactly x of that region's tiles, which is every hand's make-up
+    in region terms. It's picked up along the way: a split's deals are the
+    table entry's total times its ways times the ways to deal the regions
+    after it (see _completion_tables), so it costs one lookup per step next
+    to the channel vector work.
+    """
+    hand_count = len(hand_sizes)
+    value_count = _value_count(value_counts)
+    channels = 1 + hand_count * value_count
+    zero, multiply_add, as_vector = _vector_ops(precision, channels)
+
+    counter = DealCounter(region_sizes, hand_count)
+    held = _empty_held(counter) if with_zones else None
+    if not _dealable(counter, hand_sizes):
+        return _results(zero(), 0.0, hand_count, value_count, precision) + \
+            ((held,) if with_zones else ())
+    shared = {}
+    completions = _completion_tables(counter, hand_sizes, precision, shared) \
+        if with_zones else None
+    table = {tuple([0] * hand_count): as_vector([1] * channels)}
+    table, scale = _deal_value_regions(counter, table, 0, len(counter.regions),
+                                       value_counts, hand_sizes, precision, shared,
+                                       held=held, completions=completions)
+    return _results(table.get(tuple(hand_sizes), zero()), scale, hand_count,
+                    value_count, precision) + ((held,) if with_zones else ())
+
+
+def _dealable(counter: DealCounter, hand_sizes: HandSizes) -> bool:
+    return counter.valid and all(size >= 0 for size in hand_sizes) and \
+        all(need <= cap for need, cap in zip(hand_sizes, counter.capacity))
+
+
+def _empty_held(counter: DealCounter) -> dict:
+    return {mask: {i: {} for i in owners} for mask, size, owners in counter.regions if size}
+
+
+def _merge_held(held: dict, part: dict, add):
+    """ Adds one chunk's with_zones counts into held """
+    for mask, hands in part.items():
+        for i, counts in hands.items():
+            zone_held = held[mask][i]
+            for x, deals in counts.items():
+                zone_held[x] = add(zone_held[x], deals) if x in zone_held else deals
+
+
+def _value_count(value_counts: ValueCounts) -> int:
+    return max((len(counts) for counts in value_counts.values()), default=0)
+
+
+def _split_channels(vector, hand_count: int, value_count: int):
+    """ Channel vector -> (total, avoided[hand][value]) """
+    return vector[0], [[vector[1 + i * value_count + v] for v in range(value_count)]
+                       for i in range(hand_count)]
+
+
+def _results(vector, scale: float, hand_count: int, value_count: int, precision: str):
+    """ The final channel vector of a table with the given log scale ->
+    (total, avoided[hand][value]) in the precision """
+    if precision == "log":
+        vector = [scale + _log(count) for count in vector]
+    return _split_channels(vector, hand_count, value_count)
+
+
+def _deal_value_regions(counter: DealCounter, table: dict, start: int, stop: int,
+                        value_counts: ValueCounts, hand_sizes: HandSizes,
+                        precision: str, shared: dict | None = None,
+                        held: dict | None = None, scale: float = 0.0,
+                        completions: dict | None = None,
+                        carried: dict | None = None) -> tuple[dict, float]:
+    """ Moves the count_value_deals table (hand fill -> channel vector)
+    through regions start to stop - 1 of the counter's order, returning
+    it with its log scale (`scale` being the one it came in with)
+
+    Nothing that stays the same across the table entries is worked out
+    inside the loop: the least each hand has to hold after the region is
+    set per region, and the splits for a given room are listed once as
+    steps to add to a hand fill, weights included (see _RegionSteps).
+    Those only depend on the region, so `shared` can carry them over to
+    other layouts.
+
+    `held` collects count_value_deals' with_zones counts and needs the
+    _completion_tables for the regions after stop - 1 in `completions`.
+
+    `carried` (fill -> (mask, hand, tiles it took) -> deals, on the
+    table's scale) carries the held counts forward instead: every region
+    dealt adds its own and moves the ones from before along with the
+    deals, and it's updated in place to go with the returned table. What
+    it holds for the full hands is held, with no completions needed.
+    """
+    hand_count = len(hand_sizes)
+    value_count = _value_count(value_counts)
+    zero, multiply_add, _ = _vector_ops(precision, 1 + hand_count * value_count)
+    if shared is None:
+        shared = {}
+    total_needed = sum(hand_sizes)
+
+    for k in range(start, stop):
+        mask, size, owners = counter.regions[k]
+        steps = _region_steps(shared, counter, k, value_counts, hand_count, value_count,
+                              precision)
+        lowest = tuple(need - cap for need, cap in zip(hand_sizes, counter.capacity_after[k]))
+        least_total = total_needed - counter.tiles_after[k]
+        reach = tuple(counter.capacity_after[k][i] for i in owners)
+        others = [i for i in range(hand_count) if i not in owners]
+        if held is not None:
+            after, after_scale = completions[k + 1]
+            region_held = {i: {} for i in owners}
+        if carried is not None:
+            next_carried = {}
+        next_table = {}
+        for filled, counts in table.items():
+            # Hands outside the region can't catch up in it
+            if any(filled[i] < lowest[i] for i in others):
+                continue
+            short = least_total - sum(filled)
+            if short > size:
+                continue
+            room = tuple(hand_sizes[i] - filled[i] for i in owners)
+            for step, taken, split, weight, ways in steps(room, reach):
+                if taken < short:
+                    continue
+                new_filled = tuple(map(operator.add, filled, step))
+                next_table[new_filled] = multiply_add(
+                    next_table[new_filled] if new_filled in next_table else zero(),
+                    counts, weight)
+                if carried is not None:
+                    into = next_carried.setdefault(new_filled, {})
+                    for key, deals in carried.get(filled, {}).items():
+                        deals *= ways
+                        into[key] = into[key] + deals if key in into else deals
+                    deals = counts[0] * ways
+                    for i, x in zip(owners, split):
+                        key = (mask, i, x)
+                        into[key] = into[key] + deals if key in into else deals
+                if held is not None:
+                    ahead = after.get(new_filled)
+                    if not ahead:
+                        continue
+                    deals = counts[0] * ways * ahead
+                    for i, x in zip(owners, split):
+                        hand_held = region_held[i]
+                        hand_held[x] = hand_held[x] + deals if x in hand_held else deals
+        if held is not None:
+            deals_scale = scale + steps.scale + after_scale
+            held[mask] = {i: {x: _unscale(deals, deals_scale, precision)
+                              for x, deals in hand_held.items()}
+                          for i, hand_held in region_held.items()}
+        table = next_table
+        scale += steps.scale
+        if precision == "log":
+            taken_out = _rescale(table)
+            scale += taken_out
+            if carried is not None and taken_out:
+                factor = math.exp(-taken_out)
+                for into in next_carried.values():
+                    for key in into:
+                        into[key] *= factor
+        if carried is not None:
+            carried.clear()
+            carried.update(next_carried)
+    return table, scale
+
+
+def _value_deals_chunk(region_sizes: RegionSizes, value_counts: ValueCounts,
+                       hand_sizes: HandSizes, precision: str, k: int,
+                       chunk: list, scale: float = 0.0, after: tuple | None = None):
+    """ Work unit for parallel_count_value_deals: deals region k to a
+    slice of the table and returns that slice's part of the next table
+    with its log scale, and its part of the with_zones counts when given
+    the completions of the regions after k """
+    counter = DealCounter(region_sizes, len(hand_sizes))
+    held = _empty_held(counter) if after is not None else None
+    table, scale = _deal_value_regions(counter, dict(chunk), k, k + 1, value_counts,
+                                       hand_sizes, precision, held=held, scale=scale,
+                                       completions={k + 1: after})
+    return table, scale, held
+
+
+def parallel_count_value_deals(region_sizes: RegionSizes, value_counts: ValueCounts,
+                               hand_sizes: HandSizes, precision: str = "exact",
+                               executor: Executor | None = None, workers: int | None = None,
+                               chunks_per_worker: int = 2, min_parallel: int = 64,
+                               with_zones: bool = False):
+    """ count_value_deals spread over a process pool
+
+    Each region is dealt to the whole table before moving on to the next,
+    and the table entries don't depend on each other while that happens,
+    so once the table has `min_parallel` entries it's cut into chunks and
+    the chunks are dealt by the workers. Their partial tables are summed
+    back into one before the next region, which keeps every state merged
+    (no work is repeated across chunks) and the counts exact.
+
+    Pass an executor to reuse one pool across calls, otherwise a pool of
+    `workers` processes is made for this call. `workers` defaults to the
+    number of CPUs and sets how many chunks the table is cut into.
+    with_zones is the same as count_value_deals', each chunk collects its
+    entries' share and the shares are summed with the tables.
+    """
+    workers = workers or os.cpu_count() or 1
+    hand_count = len(hand_sizes)
+    value_count = _value_count(value_counts)
+    channels = 1 + hand_count * value_count
+    zero, multiply_add, as_vector = _vector_ops(precision, channels)
+
+    counter = DealCounter(region_sizes, hand_count)
+    held = _empty_held(counter) if with_zones else None
+    if not _dealable(counter, hand_sizes):
+        return _results(zero(), 0.0, hand_count, value_count, precision) + \
+            ((held,) if with_zones else ())
+    add = _log_add if precision == "log" else operator.add
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(workers)
+    try:
+        region_sizes = dict(region_sizes)
+        hand_sizes = tuple(hand_sizes)
+        shared = {}
+        completions = _completion_tables(counter, hand_sizes, precision, shared) \
+            if with_zones else {}
+        ones = as_vector([1] * channels)
+        table = {tuple([0] * hand_count): ones}
+        scale = 0.0
+        for k in range(len(counter.regions)):
+            if len(table) < min_parallel:
+                table, scale = _deal_value_regions(counter, table, k, k + 1, value_counts,
+                                                   hand_sizes, precision, shared, held,
+                                                   scale, completions)
+                continue
+            entries = list(table.items())
+            chunk_size = -(-len(entries) // (workers * chunks_per_worker))
+            futures = [executor.submit(_value_deals_chunk, region_sizes, value_counts,
+                                       hand_sizes, precision, k, entries[i:i + chunk_size],
+                                       scale, completions.get(k + 1))
+                       for i in range(0, len(entries), chunk_size)]
+            parts = [future.result() for future in futures]
+            # Log chunks each rescale their own part, so they're lined up
+            # on the biggest scale before they're added
+            scale = max(part_scale for _, part_scale, _ in parts)
+            table = {}
+            for part, part_scale, part_held in parts:
+                if with_zones:
+                    _merge_held(held, part_held, add)
+                factor = as_vector([math.exp(part_scale - scale)] * channels) \
+                    if part_scale != scale else ones
+                for filled, counts in part.items():
+                    table[filled] = multiply_add(table[filled], counts, factor) \
+                        if filled in table else multiply_add(zero(), counts, factor)
+        return _results(table.get(hand_sizes, zero()), scale, hand_count, value_count,
+                        precision) + ((held,) if with_zones else ())
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+def batch_count_value_deals(layouts, precision: str = "exact") -> list:
+    """ count_value_deals for many (region_sizes, value_counts, hand_sizes)
+    layouts at once, returning the results in the same order
+
+    Identical layouts are counted once, and every layout shares the region
+    splits and channel weights worked out for the others. Positions from
+    real games rarely share whole regions (the hand sizes or some zone
+    differ almost every time), but the same region sizes and hand room
+    keep coming back.
+    """
+    layouts = [(dict(region_sizes), value_counts, tuple(hand_sizes))
+               for region_sizes, value_counts, hand_sizes in layouts]
+    keys = [(tuple(sorted(region_sizes.items())),
+             tuple(sorted((mask, tuple(values)) for mask, values in value_counts.items())),
+             hand_sizes)
+            for region_sizes, value_counts, hand_sizes in layouts]
+    shared = {}
+    results = {}
+    for key, (region_sizes, value_counts, hand_sizes) in zip(keys, layouts):
+        if key in results:
+            continue
+        hand_count = len(hand_sizes)
+        value_count = _value_count(value_counts)
+        channels = 1 + hand_count * value_count
+        zero, _, as_vector = _vector_ops(precision, channels)
+        counter = DealCounter(region_sizes, hand_count)
+        if not _dealable(counter, hand_sizes):
+            results[key] = _results(zero(), 0.0, hand_count, value_count, precision)
+            continue
+        table = {tuple([0] * hand_count): as_vector([1] * channels)}
+        table, scale = _deal_value_regions(counter, table, 0, len(counter.regions),
+                                           value_counts, hand_sizes, precision, shared)
+        results[key] = _results(table.get(hand_sizes, zero()), scale,
+                                hand_count, value_count, precision)
+    return [results[key] for key in keys]
+
+
+class IncrementalValueDeals:
+    """ count_value_deals for a layout that changes a few regions at a time
+
+    The regions are dealt in a fixed order and the table after every
+    region is kept, so when a layout first differs from the last one at
+    region k only regions k onwards are dealt again, and the last region
+    is the only one dealt for a layout that's the same.
+
+    A kept table only has the fills the hand sizes it was dealt for could
+    be reached from, so one that could be missing fills the hand sizes
+    now need is dealt again, along with the ones after it. With zones,
+    the make-ups are carried forward with the tables (see
+    _deal_value_regions' carried), so only the regions dealt again add
+    to them and nothing is walked back from the end.
+    """
+
+    def __init__(self, order: list[int], hand_count: int):
+        self.order = order
+        self.hand_count = hand_count
+        self._counter = DealCounter({}, hand_count, order)
+        # precision -> (channels, (size, value counts) per region, tables)
+        # with tables[k] = (table before region k, its log scale, the
+        # hand sizes it covers, see _covers)
+        self._dealt: dict[str, tuple] = {}
+        # (precision, with_zones) -> (hand sizes, layouts, what count returned)
+        self._last: dict[tuple, tuple] = {}
+        self._shared: dict = {}
+
+    def count(self, region_sizes: RegionSizes, value_counts: ValueCounts,
+              hand_sizes: HandSizes, precision: str = "exact", with_zones: bool = False):
+        """ Same as count_value_deals """
+        hand_sizes = tuple(hand_sizes)
+        layouts = [(region_sizes.get(mask, 0), tuple(value_counts.get(mask, ())))
+                   for mask in self.order]
+        last = self._last.get((precision, with_zones))
+        if last is not None and last[0] == hand_sizes and last[1] == layouts:
+            return last[2]
+        found = self._count(layouts, value_counts, hand_sizes, precision, with_zones)
+        self._last[precision, with_zones] = (hand_sizes, layouts, found)
+        return found
+
+    def _covers(self, covered: tuple, k: int, hand_sizes: HandSizes) -> bool:
+        """ Whether the table dealt through region k still holds every fill
+        the hand sizes can be reached from. covered is (hand sizes it was
+        dealt for, least each hand held, least they held between them). """
+        counter = self._counter
+        dealt_sizes, least, least_total = covered
+        return all(map(operator.le, hand_sizes, dealt_sizes)) and \
+            sum(hand_sizes) - counter.tiles_after[k] >= least_total and \
+            all(need - cap >= low for need, cap, low
+                in zip(hand_sizes, counter.capacity_after[k], least))
+
+    def _count(self, layouts: list[tuple], value_counts: ValueCounts, hand_sizes: HandSizes,
+               precision: str, with_zones: bool):
+        hand_count = self.hand_count
+        value_count = _value_count(value_counts)
+        channels = 1 + hand_count * value_count
+        zero, _, as_vector = _vector_ops(precision, channels)
+        counter = self._counter
+        for mask, (size, _) in zip(self.order, layouts):
+            counter.resize(mask, size)
+        if not _dealable(counter, hand_sizes):
+            return _results(zero(), 0.0, hand_count, value_count, precision) + \
+                ((_empty_held(counter),) if with_zones else ())
+        last = len(counter.regions) - 1
+        start = 0
+        dealt_channels, dealt_layouts, tables = self._dealt.get(precision, (None, None, None))
+        if dealt_channels == channels:
+            # The held counts are only carried once zones are asked for
+            start = next((k for k in range(last)
+                          if layouts[k] != dealt_layouts[k] or
+                          not self._covers(tables[k + 1][2], k, hand_sizes) or
+                          with_zones and tables[k + 1][3] is None), last)
+            tables = tables[:start + 1]
+        else:
+            tables = [({tuple([0] * hand_count): as_vector([1] * channels)}, 0.0, None, {})]
+        for k in range(start, last):
+            table, scale, _, carried = tables[k]
+            carried = dict(carried) if with_zones and carried is not None else None
+            if layouts[k][0]:
+                table, scale = _deal_value_regions(counter, table, k, k + 1, value_counts,
+                                                   hand_sizes, precision, self._shared,
+                                                   scale=scale, carried=carried)
+            least = tuple(map(operator.sub, hand_sizes, counter.capacity_after[k]))
+            covered = (hand_sizes, least, sum(hand_sizes) - counter.tiles_after[k])
+            tables.append((table, scale, covered, carried))
+        self._dealt[precision] = (channels, layouts, tables)
+
+        table, scale, _, carried = tables[last]
+        carried = dict(carried) if with_zones else None
+        table, scale = _deal_value_regions(counter, table, last, last + 1, value_counts,
+                                           hand_sizes, precision, self._shared,
+                                           scale=scale, carried=carried)
+        found = _results(table.get(hand_sizes, zero()), scale, hand_count, value_count,
+                         precision)
+        if not with_zones:
+            return found
+        held = _empty_held(counter)
+        for (mask, i, x), deals in carried.get(hand_sizes, {}).items():
+            # An empty last region is still dealt (nothing) to move the table on
+            if mask in held:
+                held[mask][i][x] = _unscale(deals, scale, precision)
+        return found + (held,)
@@ -0,0 +1,174 @@
+""" DealEnumerator.py
+
+Walks every concrete deal of the regions instead of just counting them.
+
+Tiles are bits: a region is an owner mask (see DealCounter) mapped to the
+bitmask of the tiles in it, which is exactly what BitmaskVennGraph keeps
+per set. A deal comes out as a tuple with one tile bitmask per hand.
+
+The walk follows the same chain as DealCounter (one region, one owner at a
+time) and asks the counter how many deals are under every choice before
+taking it, so:
+  - it never goes down a branch with nothing in it, every step ends in a
+    deal and no deal comes out twice
+  - it only ever holds the current path, however many deals there are
+  - whole branches can be skipped by their count, so deals[start:stop]
+    jumps straight to `start` instead of generating everything before it
+
+That's what makes it usable as ground truth for the closed-form counters
+on layouts far too big for combinations.hardcoded_all_combinations.
+"""
+
+import itertools
+from typing import Iterator
+
+from Binomials import comb, row
+from DealCounter import DealCounter, HandSizes
+
+type RegionTiles = dict[int, int]
+type Deal = tuple[int, ...]
+
+
+def tiles_from_graph(graph, hand_names: list[str]) -> RegionTiles:
+    """ Converts the sets of a BitmaskVennGraph into the owner mask ->
+    tile bitmask dict the enumerator uses. Hand i is hand_names[i], and
+    bits in the deals map back to dominoes through graph.get_element. """
+    bits = {name: 1 << i for i, name in enumerate(hand_names)}
+    regions = {}
+    for set_name in graph.sets:
+        mask = 0
+        for name in set_name:
+            mask |= bits[name]
+        regions[mask] = graph.get_mask(*set_name)
+    return regions
+
+
+def _bits(tiles: int) -> list[int]:
+    """ Returns the single bit masks set in tiles, lowest first """
+    found = []
+    while tiles:
+        low_bit = tiles & -tiles
+        found.append(low_bit)
+        tiles ^= low_bit
+    return found
+
+
+def _combinations_from(items: list[int], x: int, rank: int) -> Iterator[tuple[int, ...]]:
+    """ Same as itertools.combinations(items, x) but starting at the
+    combination with the given rank instead of the first one """
+    m = len(items)
+    picked = []
+    start = 0
+    for still_to_pick in range(x, 0, -1):
+        for c in range(start, m):
+            block = comb(m - c - 1, still_to_pick - 1)
+            if rank < block:
+                picked.append(c)
+                start = c + 1
+                break
+            rank -= block
+    while True:
+        yield tuple(items[c] for c in picked)
+        # Lexicographic successor: bump the rightmost index that can move
+        # and pack everything after it right behind it
+        p = x - 1
+        while p >= 0 and picked[p] == m - x + p:
+            p -= 1
+        if p < 0:
+            return
+        picked[p] += 1
+        for q in range(p + 1, x):
+            picked[q] = picked[q - 1] + 1
+
+
+class DealEnumerator:
+    """ Lazy, duplicate free sequence of every deal of the regions into
+    hands of the given sizes. Tiles nobody takes stay out of the deal.
+
+    len() is the deal count, iterating streams the deals and indexing or
+    slicing skips straight to the first deal asked for.
+    """
+
+    def __init__(self, region_tiles: RegionTiles, hand_sizes: HandSizes):
+        self.region_tiles = dict(region_tiles)
+        self.hand_sizes = tuple(hand_sizes)
+        self.counter = DealCounter(
+            {mask: tiles.bit_count() for mask, tiles in self.region_tiles.items()},
+            len(self.hand_sizes))
+        self._total = self.counter.count(self.hand_sizes)
+
+    def __len__(self):
+        return self._total
+
+    def __iter__(self) -> Iterator[Deal]:
+        return self.deals()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._total)
+            if step < 0:
+                raise ValueError("deals can only be sliced forwards")
+            return itertools.islice(self.deals(start, stop), 0, None, step)
+        if index < 0:
+            index += self._total
+        if not 0 <= index < self._total:
+            raise IndexError("deal index out of range")
+        return next(self.deals(index, index + 1))
+
+    def deals(self, start: int = 0, stop: int | None = None) -> Iterator[Deal]:
+        """ Yields the deals with positions start <= position < stop """
+        stop = self._total if stop is None else min(stop, self._total)
+        if start >= stop:
+            return
+        hands = (0,) * len(self.hand_sizes)
+        if not self.counter.regions:
+            yield hands
+            return
+        first_tiles = self._region_bits(0)
+        walk = self._walk(0, 0, first_tiles, self.hand_sizes, hands, start)
+        yield from itertools.islice(walk, stop - start)
+
+    def _region_bits(self, k: int) -> list[int]:
+        return _bits(self.region_tiles[self.counter.regions[k][0]])
+
+    def _walk(self, k: int, j: int, left: list[int], remaining: HandSizes,
+              hands: Deal, skip: int) -> Iterator[Deal]:
+        """ Owner j of region k picks from the tiles still `left`, skipping
+        the first `skip` deals under this point """
+        regions = self.counter.regions
+        mask, size, owners = regions[k]
+        if j == len(owners):
+            if k + 1 == len(regions):
+                yield hands
+            else:
+                yield from self._walk(k + 1, 0, self._region_bits(k + 1),
+                                      remaining, hands, skip)
+            return
+
+        i = owners[j]
+        need = remaining[i]
+        binomials = row(len(left))
+        for x in range(min(len(left), need) + 1):
+            next_remaining = remaining[:i] + (need - x,) + remaining[i + 1:]
+            per_pick = self.counter.completions(
+                k, j + 1, len(left) - x, next_remaining)
+            if not per_pick:
+                continue
+            block = binomials[x] * per_pick
+            if skip >= block:
+                skip -= block
+                continue
+            for picked in _combinations_from(left, x, skip // per_pick):
+                taken = sum(picked)
+                next_hands = hands[:i] + (hands[i] | taken,) + hands[i + 1:]
+                rest = [bit for bit in left if not bit & taken]
+                yield from self._walk(k, j + 1, rest, next_remaining,
+                                      next_hands, skip % per_pick)
+                skip = 0
+            skip = 0
+
+
+def enumerate_deals(region_tiles: RegionTiles, hand_sizes: HandSizes,
+                    start: int = 0, stop: int | None = None) -> Iterator[Deal]:
+    """ Yields the concrete deals, see DealEnumerator """
+    return DealEnumerator(region_tiles, hand_sizes).deals(start, stop)
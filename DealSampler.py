@@ -0,0 +1,85 @@
+""" DealSampler.py
+
+Draws concrete deals uniformly at random, for when exact counting is too
+slow (more hands, bigger sets) and an estimate with error bars will do.
+
+Regions and deals use the same bitmasks as DealEnumerator. A draw walks
+the DealCounter chain and at every owner picks how many tiles it takes
+with probability proportional to the number of deals under that choice,
+then picks which tiles uniformly from what's left of the region. So each
+deal comes out with probability exactly 1 / (number of deals).
+"""
+
+import math
+import random
+from statistics import NormalDist
+
+from Binomials import row
+from DealCounter import DealCounter, HandSizes
+from DealEnumerator import Deal, RegionTiles, _bits
+
+
+class DealSampler:
+    """ Uniform sampler over the deals of the regions into hands of the
+    given sizes. The counter's memo is shared by every draw, so drawing in
+    batches only pays for the counting once. """
+
+    def __init__(self, region_tiles: RegionTiles, hand_sizes: HandSizes,
+                 seed: int | None = None):
+        self.region_tiles = dict(region_tiles)
+        self.hand_sizes = tuple(hand_sizes)
+        self.counter = DealCounter(
+            {mask: tiles.bit_count() for mask, tiles in self.region_tiles.items()},
+            len(self.hand_sizes))
+        self.total = self.counter.count(self.hand_sizes)
+        self.rng = random.Random(seed)
+        self._region_bits = [_bits(self.region_tiles[mask])
+                             for mask, _, _ in self.counter.regions]
+
+    def sample(self) -> Deal:
+        """ Returns one deal, every deal being equally likely """
+        if not self.total:
+            raise ValueError("There are no deals to sample from")
+        counter = self.counter
+        hands = [0] * len(self.hand_sizes)
+        remaining = self.hand_sizes
+        for k, (mask, size, owners) in enumerate(counter.regions):
+            left = self._region_bits[k]
+            for j, i in enumerate(owners):
+                need = remaining[i]
+                # Deals under "owner takes x" are comb(left, x) times the
+                # completions after it, and add up to the deals from here
+                pick = self.rng.randrange(
+                    counter.completions(k, j, len(left), remaining))
+                binomials = row(len(left))
+                for x in range(min(len(left), need) + 1):
+                    next_remaining = remaining[:i] + (need - x,) + remaining[i + 1:]
+                    block = binomials[x] * counter.completions(
+                        k, j + 1, len(left) - x, next_remaining)
+                    if pick < block:
+                        break
+                    pick -= block
+                taken = sum(self.rng.sample(left, x))
+                hands[i] |= taken
+                left = [bit for bit in left if not bit & taken]
+                remaining = next_remaining
+        return tuple(hands)
+
+    def samples(self, draws: int) -> list[Deal]:
+        """ Returns `draws` independent deals """
+        return [self.sample() for _ in range(draws)]
+
+
+def proportion_interval(hits: int, draws: int,
+                        confidence: float = 0.95) -> tuple[float, float, float]:
+    """ Returns (estimate, low, high) for a probability seen `hits` times
+    in `draws` draws. Uses the Wilson score interval, which stays inside
+    [0, 1] and behaves when hits is 0 or draws. """
+    if not draws:
+        return 0.0, 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = hits / draws
+    denominator = 1 + z * z / draws
+    centre = (p + z * z / (2 * draws)) / denominator
+    spread = z * math.sqrt(p * (1 - p) / draws + z * z / (4 * draws * draws)) / denominator
+    return p, max(0.0, centre - spread), min(1.0, centre + spread)
@@ -0,0 +1,327 @@
+""" DealTable.py
+
+Precomputed deal counts for the double six game, kept in a flat binary
+file that gets memory-mapped at runtime.
+
+Three unknown hands of at most seven dominoes each, and the unknown
+dominoes are exactly the ones in their hands (nothing left in a boneyard).
+So for hand sizes h1, h2, h3 the seven zone sizes always add up to
+T = h1 + h2 + h3, and every (zone sizes, hand sizes) pair the game can
+reach has a slot in the file:
+
+    offset of (h1, h2, h3)  +  rank of the zone sizes among all the ways
+                               to split T into seven zones
+
+The rank is the stars and bars position of the split, so a lookup is a
+bit of arithmetic and one read out of the mapped file.
+
+Every slot holds its count plus one, and 0 means it hasn't been counted
+yet. Opening a path that doesn't exist creates a sparse file of the full
+size (51 MB for hands of seven, but only the pages that get written take
+up disk), and every layout is counted the first time it's looked up and
+written back, so a game only ever pays for the layouts it reaches.
+
+`python DealTable.py [path]` fills in every slot up front instead. That
+takes minutes for hands of seven: 2m13s and 6m19s on the two machines
+it was timed on (20s for hands of five).
+"""
+
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+from Binomials import comb, row
+from DealCounter import count_deals, count_value_deals
+
+# Zone owner masks in file order, see DealCounter for the mask layout.
+ZONE_ORDER = (0b001, 0b010, 0b100, 0b011, 0b101, 0b110, 0b111)
+_ZONE_INDEX = {mask: j for j, mask in enumerate(ZONE_ORDER)}
+HAND_COUNT = 3
+MAX_HAND = 7
+DEFAULT_PATH = "deal_table.bin"
+
+_MAGIC = b"DTBL"
+_VERSION = 2
+_HEADER = struct.Struct("<4sHHHHQ")
+_ENTRY_FORMATS = {4: "<I", 8: "<Q"}
+
+
+def composition_rank(sizes: tuple[int, ...]) -> int:
+    """ Position of the zone sizes among all splits of sum(sizes) into
+    len(sizes) zones (colex order of the stars and bars) """
+    rank = 0
+    position = -1
+    for j, size in enumerate(sizes[:-1]):
+        position += size + 1
+        rank += comb(position, j + 1)
+    return rank
+
+
+def _hand_offsets(max_hand: int) -> dict[tuple[int, ...], int]:
+    """ Where each hand size triple's block starts, plus the total size """
+    offsets = {}
+    offset = 0
+    for h1 in range(max_hand + 1):
+        for h2 in range(max_hand + 1):
+            for h3 in range(max_hand + 1):
+                offsets[(h1, h2, h3)] = offset
+                offset += comb(h1 + h2 + h3 + len(ZONE_ORDER) - 1,
+                               len(ZONE_ORDER) - 1)
+    offsets[None] = offset
+    return offsets
+
+
+def _entry_width(max_hand: int) -> int:
+    """ Bytes per count. The most deals there can be is every domino being
+    free to go anywhere, a multinomial of the three full hands, and the
+    slots hold the count plus one. """
+    largest = math.factorial(HAND_COUNT * max_hand) // \
+        math.factorial(max_hand) ** HAND_COUNT
+    for width in sorted(_ENTRY_FORMATS):
+        if largest + 1 < 1 << (8 * width):
+            return width
+    raise ValueError(f"Counts for hands of {max_hand} don't fit in 64 bits")
+
+
+def _full_splits(size: int, room: list[int]):
+    """ Every way to hand all `size` tiles to the owners without going over
+    their room, with the number of ways to pick the tiles """
+    if len(room) == 1:
+        if size <= room[0]:
+            yield (size,), 1
+        return
+    binomials = row(size)
+    for x in range(min(size, room[0]) + 1):
+        ways = binomials[x]
+        for rest, rest_ways in _full_splits(size - x, room[1:]):
+            yield (x,) + rest, ways * rest_ways
+
+
+def _deal_zone(table: dict, mask: int, size: int, max_hand: int) -> dict:
+    """ One step of the counting DP: hands out a whole zone to its owners """
+    owners = [i for i in range(HAND_COUNT) if mask >> i & 1]
+    next_table = {}
+    for filled, count in table.items():
+        room = [max_hand - filled[i] for i in owners]
+        for split, ways in _full_splits(size, room):
+            new_filled = list(filled)
+            for i, x in zip(owners, split):
+                new_filled[i] += x
+            new_filled = tuple(new_filled)
+            next_table[new_filled] = next_table.get(new_filled, 0) + count * ways
+    return next_table
+
+
+def build_table(path: str = DEFAULT_PATH, max_hand: int = MAX_HAND,
+                progress: bool = False):
+    """ Counts every (zone sizes, hand sizes) pair and writes the file
+
+    Walks the zone sizes depth first so every prefix of zones is dealt
+    once and shared by everything under it. The last zone is dealt to
+    every hand at the same time, so one walk fills in the counts for
+    every hand size triple with that total.
+    """
+    offsets = _hand_offsets(max_hand)
+    width = _entry_width(max_hand)
+    entry_format = _ENTRY_FORMATS[width]
+    # Everything the walk doesn't reach has no deals
+    data = bytearray(struct.pack(entry_format, 1) * offsets[None])
+    start = time.perf_counter()
+
+    def walk(depth, left, sizes, table):
+        if not table:
+            return
+        if depth == len(ZONE_ORDER) - 1:
+            sizes = sizes + (left,)
+            rank = composition_rank(sizes)
+            for hands, count in _deal_zone(table, ZONE_ORDER[depth], left,
+                                           max_hand).items():
+                struct.pack_into(entry_format, data,
+                                 (offsets[hands] + rank) * width, count + 1)
+            return
+        for size in range(left + 1):
+            walk(depth + 1, left - size, sizes + (size,),
+                 _deal_zone(table, ZONE_ORDER[depth], size, max_hand))
+
+    for total in range(HAND_COUNT * max_hand + 1):
+        walk(0, total, (), {tuple([0] * HAND_COUNT): 1})
+        if progress:
+            print(f"total {total} done after "
+                  f"{time.perf_counter() - start:.1f}s")
+
+    with open(path, "wb") as table_file:
+        table_file.write(_header(max_hand))
+        table_file.write(data)
+
+
+def _header(max_hand: int) -> bytes:
+    return _HEADER.pack(_MAGIC, _VERSION, HAND_COUNT, max_hand,
+                        _entry_width(max_hand), _hand_offsets(max_hand)[None])
+
+
+def _create_empty(path: str, max_hand: int):
+    """ Writes a table with nothing counted yet. The slots are left as a
+    hole in the file, so it only takes up the header on disk. """
+    with open(path, "xb") as table_file:
+        table_file.write(_header(max_hand))
+        table_file.truncate(_HEADER.size + _hand_offsets(max_hand)[None] *
+                            _entry_width(max_hand))
+
+
+class DealTable:
+    """ The file, memory-mapped so opening it is cheap and only the pages
+    that get looked up are ever read in
+
+    A path that doesn't exist gets an empty table for hands up to
+    max_hand. Counts missing from the file are worked out on lookup and
+    written back, unless the file can only be opened for reading.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_hand: int = MAX_HAND):
+        if not os.path.exists(path):
+            _create_empty(path, max_hand)
+        try:
+            self._file = open(path, "r+b")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE)
+            self.writable = True
+        except PermissionError:
+            self._file = open(path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.writable = False
+        magic, version, hand_count, max_hand, width, entries = \
+            _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION or hand_count != HAND_COUNT:
+            raise ValueError(f"{path} is not a deal table this code can read")
+        self.max_hand = max_hand
+        self._width = width
+        self._entry = struct.Struct(_ENTRY_FORMATS[width])
+        self._offsets = _hand_offsets(max_hand)
+        if self._offsets[None] != entries:
+            raise ValueError(f"{path} is truncated or was built differently")
+        # composition_rank's binomials, _rank_terms[j][position], so a
+        # lookup adds up a few list entries
+        positions = range(HAND_COUNT * max_hand + len(ZONE_ORDER))
+        self._rank_terms = [[comb(position, j + 1) for position in positions]
+                            for j in range(len(ZONE_ORDER) - 1)]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def lookup(self, region_sizes: dict[int, int],
+               hand_sizes: tuple[int, ...]) -> int | None:
+        """ Returns the deal count, or None when the layout isn't one the
+        table covers (leftover dominoes or oversized hands) """
+        if min(region_sizes.values(), default=0) < 0:
+            return 0
+        return self._lookup_sizes([region_sizes.get(mask, 0) for mask in ZONE_ORDER],
+                                  hand_sizes)
+
+    def _lookup_sizes(self, sizes: list[int], hand_sizes: tuple[int, ...]) -> int | None:
+        """ lookup with the zone sizes already in ZONE_ORDER """
+        at, count = self._find(sizes, hand_sizes)
+        if count is None and at is not None:
+            count = count_deals(dict(zip(ZONE_ORDER, sizes)), hand_sizes)
+            self._store(at, count)
+        return count
+
+    def _find(self, sizes: list[int],
+              hand_sizes: tuple[int, ...]) -> tuple[int | None, int | None]:
+        """ (where the slot is, count in it) for zone sizes in ZONE_ORDER.
+        The count is None while the slot hasn't been counted. Layouts
+        without a slot come back as (None, 0) when they can't be dealt and
+        (None, None) when the table doesn't cover them. """
+        # Only hand size triples the table goes up to have an offset
+        offset = self._offsets.get(tuple(hand_sizes))
+        if offset is None:
+            return None, None
+        in_zones = sum(sizes)
+        dealt = sum(hand_sizes)
+        if in_zones != dealt:
+            return None, 0 if in_zones < dealt else None
+        # Same as composition_rank(sizes)
+        rank = 0
+        position = -1
+        for terms, size in zip(self._rank_terms, sizes):
+            position += size + 1
+            rank += terms[position]
+        at = _HEADER.size + (offset + rank) * self._width
+        stored = self._entry.unpack_from(self._map, at)[0]
+        return at, stored - 1 if stored else None
+
+    def _store(self, at: int, count: int):
+        if self.writable:
+            # Threads racing on the same slot write the same bytes
+            self._entry.pack_into(self._map, at, count + 1)
+
+    def count(self, region_sizes: dict[int, int],
+              hand_sizes: tuple[int, ...]) -> int:
+        """ count_deals, answered from the table whenever it can be """
+        found = self.lookup(region_sizes, hand_sizes)
+        if found is None:
+            return count_deals(region_sizes, hand_sizes)
+        return found
+
+    def count_value_deals(self, region_sizes: dict[int, int],
+                          value_counts: dict[int, tuple[int, ...]],
+                          hand_sizes: tuple[int, ...]) -> tuple[int, list[list[int]]] | None:
+        """ DealCounter.count_value_deals in exact precision out of the
+        table, (total, avoided[hand][value]), or None when the layout
+        isn't one the table covers. Taking a value's tiles out of a hand's
+        reach only moves them to another zone or out of the deal, so when
+        the layout is covered every one of the avoided counts is too.
+
+        When any of the counts is missing from the file, all of them come
+        out of one count_value_deals pass and get written back, which is
+        cheaper than counting the missing layouts one at a time.
+        """
+        value_count = max((len(counts) for counts in value_counts.values()), default=0)
+        if min(region_sizes.values(), default=0) < 0:
+            return 0, [[0] * value_count for _ in range(HAND_COUNT)]
+        sizes = [region_sizes.get(mask, 0) for mask in ZONE_ORDER]
+        at, total = self._find(sizes, hand_sizes)
+        if at is None:
+            if total is None:
+                return None
+            return total, [[0] * value_count for _ in range(HAND_COUNT)]
+        # (slot, count) for every hand and value
+        slots = []
+        for hand in range(HAND_COUNT):
+            bit = 1 << hand
+            # (zone, zone its tiles go to without the hand, value counts)
+            moves = [(j, _ZONE_INDEX.get(mask & ~bit), value_counts[mask])
+                     for j, mask in enumerate(ZONE_ORDER) if mask & bit and sizes[j]]
+            hand_slots = []
+            for value in range(value_count):
+                without = sizes.copy()
+                for j, k, values in moves:
+                    without[j] -= values[value]
+                    if k is not None:
+                        without[k] += values[value]
+                hand_slots.append((at, total) if without == sizes
+                                  else self._find(without, hand_sizes))
+            slots.append(hand_slots)
+        if total is not None and all(count is not None
+                                     for hand_slots in slots for _, count in hand_slots):
+            return total, [[count for _, count in hand_slots] for hand_slots in slots]
+        total, avoided = count_value_deals(region_sizes, value_counts, hand_sizes)
+        self._store(at, total)
+        for hand_slots, counts in zip(slots, avoided):
+            for (slot, _), count in zip(hand_slots, counts):
+                if slot is not None:
+                    self._store(slot, count)
+        return total, avoided
+
+
+if __name__ == "__main__":
+    build_table(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH,
+                progress=True)
@@ -1,7 +1,18 @@
+import math
 from collections import defaultdict
+from concurrent.futures import Executor
 from enum import Enum
-import math
 from fractions import Fraction
+from typing import Callable, NamedTuple
+
+from DealCounter import (DealCounter, IncrementalValueDeals, batch_count_value_deals,
+                         count_value_deals, from_exact, log_subtract,
+                         parallel_count_value_deals, ratio)
+from DealSampler import DealSampler, proportion_interval
+from DealTable import DealTable
+from StatsCache import StatsCache
+from Zobrist import (HAND_KEYS, MINE_KEYS, TURN_KEYS, ZONE_KEYS, ends_key,
+                     position_key)
 
 debug = False
 
@@ -23,6 +34,21 @@ class _Zone(Enum):
     ZONE_123 = 7
 
 
+# Bit of each opponent in a zone's owner mask and the mask for every zone,
+# see DealCounter.
+_PLAYER_BITS = {_Player.PLAYER_1: 0b001,
+                _Player.PLAYER_2: 0b010,
+                _Player.PLAYER_3: 0b100}
+_ZONE_MASKS = {_Zone.ZONE_1: 0b001, _Zone.ZONE_2: 0b010, _Zone.ZONE_3: 0b100,
+               _Zone.ZONE_12: 0b011, _Zone.ZONE_13: 0b101, _Zone.ZONE_23: 0b110,
+               _Zone.ZONE_123: 0b111}
+# Zones each player could be holding a domino from. We could hold any of
+# the dominoes still in play.
+_PLAYER_ZONES = {player: [zone for zone in _Zone if _ZONE_MASKS[zone] & bit]
+                 for player, bit in _PLAYER_BITS.items()}
+_PLAYER_ZONES[_Player.PLAYER_0] = list(_Zone)
+
+
 class Debug:
     def __init__(self, debug=True):
         self.debug = debug
@@ -56,19 +82,28 @@ class Domino:
         if player in self.possible_owners:
             self.possible_owners.remove(player)
 
+    def copy(self):
+        domino = Domino(*self.vals)
+        domino.possible_owners = self.possible_owners.copy()
+        return domino
 
-class DominoesState():
-    _self = None
-
-    def __new__(cls):
-        if cls._self is None:
-            cls._self = super().__new__(cls)
-        return cls._self
 
+class DominoesState():
     def __init__(self):
         self.active_ends = []
-        if "_all_dominoes" not in self.__dict__:
-            self._domino_map, self._all_dominoes = self.start_board()
+        self._domino_map, self._all_dominoes = self.start_board()
+
+    def copy(self):
+        """ Returns a copy with its own dominoes, plus old -> new domino so
+        the zones can be copied over to them """
+        state = DominoesState.__new__(DominoesState)
+        state.active_ends = self.active_ends[::]
+        copies = {domino: domino.copy() for domino in self._all_dominoes}
+        state._all_dominoes = [copies[domino] for domino in self._all_dominoes]
+        state._domino_map = defaultdict(list, {
+            num: [copies[domino] for domino in dominoes]
+            for num, dominoes in self._domino_map.items()})
+        return state, copies
 
     def start_board(self):
         domino_map = defaultdict(list)
@@ -115,16 +150,16 @@ class DominoesState():
 
 
 class PlayersState:
-    _self = None
-
-    def __new__(cls):
-        if cls._self is None:
-            cls._self = super().__new__(cls)
-        return cls._self
-
     def __init__(self):
-        if "_all_players" not in self.__dict__:
-            self._all_players = self.start_players()
+        self._all_players = self.start_players()
+
+    def copy(self):
+        state = PlayersState.__new__(PlayersState)
+        state._all_players = {}
+        for name, player in self._all_players.items():
+            state._all_players[name] = Player(player.hand_size)
+            state._all_players[name].passed = dict(player.passed)
+        return state
 
     def start_players(self):
         return {_Player.PLAYER_0: Player(), _Player.PLAYER_1: Player(),
@@ -137,16 +172,37 @@ class PlayersState:
 
 
 class ZonesState:
-    _self = None
-
-    def __new__(cls, dominoes):
-        if cls._self is None:
-            cls._self = super().__new__(cls)
-        return cls._self
-
     def __init__(self, dominoes):
-        if "_all_zones" not in self.__dict__:
-            self._all_zones, self._domino_to_zone = self.make_zones(dominoes)
+        self._all_zones, self._domino_to_zone = self.make_zones(dominoes)
+        self._listeners = []
+        self._build_index()
+
+    def _build_index(self):
+        """ value -> zone -> dominoes with that value (a dict used as an
+        ordered set), kept up to date on every remove/shift """
+        self._by_value = {value: {zone: {} for zone in _Zone} for value in range(7)}
+        for zone, dominoes in self._all_zones.items():
+            for domino in dominoes:
+                self._index(domino, zone, 1)
+
+    def _index(self, domino, zone, change):
+        for value in set(domino.vals):
+            if change > 0:
+                self._by_value[value][zone][domino] = None
+            else:
+                del self._by_value[value][zone][domino]
+
+    def copy(self, copies):
+        """ Returns a copy over the copied dominoes (old -> new domino, see
+        DominoesState.copy). Listeners stay with the original. """
+        state = ZonesState.__new__(ZonesState)
+        state._all_zones = {zone: [copies[domino] for domino in dominoes]
+                            for zone, dominoes in self._all_zones.items()}
+        state._domino_to_zone = {copies[domino]: zone
+                                 for domino, zone in self._domino_to_zone.items()}
+        state._listeners = []
+        state._build_index()
+        return state
 
     def make_zones(self, all_dominoes):
         groups = {}
@@ -158,28 +214,47 @@ class ZonesState:
             domino_to_zone[domino] = _Zone.ZONE_123
         return groups, domino_to_zone
 
+    def subscribe(self, listener):
+        """ listener(domino, old_zone, new_zone) gets called every time a
+        domino changes zones. new_zone is None when it leaves play. """
+        self._listeners.append(listener)
+
+    def _notify(self, domino, old_zone, new_zone):
+        for listener in self._listeners:
+            listener(domino, old_zone, new_zone)
+
     def remove(self, domino):
         if self._domino_to_zone[domino] and domino in self._all_zones[self._domino_to_zone[domino]]:
+            old_zone = self._domino_to_zone[domino]
             self._all_zones[self._domino_to_zone[domino]].remove(domino)
+            self._index(domino, old_zone, -1)
             domino.clear()
             self._domino_to_zone[domino] = None
+            self._notify(domino, old_zone, None)
         else:
             if self._domino_to_zone[domino]:
                 print("ERROR REMOVING", self._domino_to_zone[domino],
                       domino, self._all_zones[self._domino_to_zone[domino]])
 
     def shift(self, domino, player):
+        """ Takes the player out of the domino's possible owners. Returns
+        whether that moved it to another zone. """
         curr_zone_players = self.zone_to_players(self._domino_to_zone[domino])
         new_zone_players = set(curr_zone_players) - set([player])
 
-        if curr_zone_players == new_zone_players:
-            return
+        if set(curr_zone_players) == new_zone_players:
+            return False
         if domino not in self._all_zones[self._domino_to_zone[domino]]:
-            return
+            return False
+        old_zone = self._domino_to_zone[domino]
         domino.remove(player)
         self._all_zones[self._domino_to_zone[domino]].remove(domino)
         self._all_zones[self.players_to_zone(new_zone_players)].append(domino)
         self._domino_to_zone[domino] = self.players_to_zone(new_zone_players)
+        self._index(domino, old_zone, -1)
+        self._index(domino, self._domino_to_zone[domino], 1)
+        self._notify(domino, old_zone, self._domino_to_zone[domino])
+        return True
 
     def assignToP0(self, domino):
         self.remove(domino)
@@ -209,7 +284,55 @@ class ZonesState:
         return zone_players[zone]
 
     def player_to_dominoes(self, player: _Player):
-        return [domino for domino, _ in self._domino_to_zone.items() if player in domino.possible_owners]
+        return [domino for zone in _PLAYER_ZONES[player] for domino in self._all_zones[zone]]
+
+    def count_with_value(self, zone: _Zone, value: int):
+        return len(self._by_value[value][zone])
+
+    def connecting_dominoes(self, player: _Player, value: int):
+        """ Dominoes with the value that the player could be holding """
+        return [domino for zone in _PLAYER_ZONES[player]
+                for domino in self._by_value[value][zone]]
+
+    def propagate(self, hand_sizes):
+        """ Takes players out of the zones they can't be holding anything
+        from, given player -> hand size for the opponents, until nothing
+        changes. Returns how many times a domino lost a possible owner.
+
+        Pigeonhole: if a group of players can only reach as many dominoes
+        as their hands hold between them, they hold every one of those, so
+        nobody outside the group can. With nothing left over (our hand
+        assigned), that covers the other way round too: a player whose own
+        zone fills their hand holds nothing from the shared zones, since
+        the others need all of them. Once a domino is left in a single
+        player's zone we know they have it. Counts don't change, only the
+        zones the counting has to go through shrink.
+        """
+        shifted = 0
+        changed = True
+        while changed:
+            changed = False
+            sizes = {_ZONE_MASKS[zone]: len(dominoes) for zone, dominoes in self._all_zones.items()}
+            # Every group of opponents short of all three, as an owner mask
+            for group in range(1, 7):
+                reach = sum(size for mask, size in sizes.items() if mask & group)
+                need = sum(hand_sizes[player] for player, bit in _PLAYER_BITS.items()
+                           if bit & group)
+                if reach != need:
+                    continue
+                for zone in _Zone:
+                    outsiders = [player for player, bit in _PLAYER_BITS.items()
+                                 if bit & _ZONE_MASKS[zone] & ~group]
+                    if not _ZONE_MASKS[zone] & group or not outsiders:
+                        continue
+                    for domino in list(self._all_zones[zone]):
+                        for player in outsiders:
+                            if self.shift(domino, player):
+                                shifted += 1
+                                changed = True
+                if changed:
+                    break
+        return shifted
 
     def print_zones(self):
         for zone, val in self._all_zones.items():
@@ -218,50 +341,98 @@ class ZonesState:
 
 
 class Game:
-    _self = None
+    def __init__(self, propagate: bool = True):
+        self._dominoes_state = DominoesState()
+        self._players_state = PlayersState()
+        self._zones_state = ZonesState(self._dominoes_state._all_dominoes)
+        self._round = 0
+        # Pin down what the hand sizes force after every event, see
+        # ZonesState.propagate
+        self.propagate = propagate
+        self._start_hashing()
+
+    def _start_hashing(self):
+        """ Works out the Zobrist hash of the position (see GameState.key,
+        with our hand left out) and follows the zones to keep it current """
+        dominoes = self._dominoes_state._all_dominoes
+        self._tile_index = {domino: i for i, domino in enumerate(dominoes)}
+        zones = self._zones_state._domino_to_zone
+        self.key = position_key(
+            [_ZONE_MASKS[zones[domino]] if zones[domino] else 0 for domino in dominoes], 0,
+            self._dominoes_state.active_ends, self._opponent_hand_sizes(), self._round % 4)
+        self._zones_state.subscribe(self._zone_changed)
+
+    def _opponent_hand_sizes(self):
+        return [self._players_state.get_player(i)[1].hand_size for i in range(1, 4)]
+
+    def _zone_changed(self, domino, old_zone, new_zone):
+        tile = self._tile_index[domino]
+        self.key ^= ZONE_KEYS[tile][_ZONE_MASKS[old_zone] if old_zone else 0] ^ \
+            ZONE_KEYS[tile][_ZONE_MASKS[new_zone] if new_zone else 0]
+
+    def _next_round(self):
+        self.key ^= TURN_KEYS[self._round % 4] ^ TURN_KEYS[(self._round + 1) % 4]
+        self._round += 1
 
-    def __new__(cls):
-        if cls._self is None:
-            cls._self = super().__new__(cls)
-        return cls._self
-
-    def __init__(self):
-        if "_dominoes_state" not in self.__dict__:
-            self._dominoes_state = DominoesState()
-            self._players_state = PlayersState()
-            self._zones_state = ZonesState(self._dominoes_state._all_dominoes)
-            self._round = 0
+    def copy(self):
+        """ Returns an independent copy of the game, to fork it for a what-if
+        or keep a snapshot. Nothing played on one shows up on the other. """
+        game = Game.__new__(Game)
+        game._dominoes_state, copies = self._dominoes_state.copy()
+        game._players_state = self._players_state.copy()
+        game._zones_state = self._zones_state.copy(copies)
+        game._round = self._round
+        game.propagate = self.propagate
+        game._start_hashing()
+        return game
+
+    def _propagate(self):
+        if self.propagate:
+            self._zones_state.propagate({
+                player: self._players_state._all_players[player].hand_size
+                for player in _PLAYER_BITS})
 
     def player_passed(self, numbers):
         player_name, _ = self.get_current_player()
         if player_name != _Player.PLAYER_0:
             for number in numbers:
-                for domino in self._dominoes_state.get_connecting_dominoes_for_player(player_name, number):
+                for domino in self._zones_state.connecting_dominoes(player_name, number):
                     print("player doesn't have this domino - ", domino)
                     self._zones_state.shift(domino, player_name)
-        self._round += 1
+        self._propagate()
+        self._next_round()
 
     def play_right(self, domino):
+        old_ends = ends_key(self._dominoes_state.active_ends)
         if self._dominoes_state.play_on_right(domino):
+            self.key ^= old_ends ^ ends_key(self._dominoes_state.active_ends)
             self.domino_played(domino)
         else:
             print("CANT PLAY DOMINO")
 
     def play_left(self, domino):
+        old_ends = ends_key(self._dominoes_state.active_ends)
         if self._dominoes_state.play_on_left(domino):
+            self.key ^= old_ends ^ ends_key(self._dominoes_state.active_ends)
             self.domino_played(domino)
         else:
             print("CANT PLAY DOMINO")
 
     def domino_played(self, domino):
-        _, player_stats = self.get_current_player()
+        player_name, player_stats = self.get_current_player()
         self._zones_state.remove(domino)
+        if player_name in _PLAYER_BITS:
+            hand = list(_PLAYER_BITS).index(player_name)
+            self.key ^= HAND_KEYS[hand][player_stats.hand_size] ^ \
+                HAND_KEYS[hand][player_stats.hand_size - 1]
         player_stats.hand_size -= 1
-        self._round += 1
+        self._propagate()
+        self._next_round()
 
     def assignToP0(self, dominos: [int]):
         for i in dominos:
             self._zones_state.assignToP0(self._dominoes_state._all_dominoes[i])
+        self._propagate()
 
     def get_current_player(self):
         return self._players_state.get_player(self._round % 4)
@@ -283,199 +454,462 @@ class Game:
             f"Current Player -> {player_name} with hand size: {player_stats.hand_size}")
 
 
+# Tile t is the t-th domino of DominoesState.start_board, as a bit.
+_TILES = [(i, j) for i in range(7) for j in range(i, 7)]
+_ALL_TILES = (1 << len(_TILES)) - 1
+_VALUE_MASKS = tuple(sum(1 << t for t, tile in enumerate(_TILES) if value in tile)
+                     for value in range(7))
+
+
+class GameState(NamedTuple):
+    """ Immutable snapshot of a game for lookahead search
+
+    Everything is an int or a tuple of ints: possible[i] is the bitmask
+    of tiles opponent i + 1 could still hold and `mine` is our hand, so a
+    move builds a new state out of a handful of ints and shares nothing
+    mutable with the state it came from. Zones fall out of the masks, a
+    tile's zone being the opponents whose mask has it.
+    """
+    mine: int
+    possible: tuple[int, int, int]
+    hand_sizes: tuple[int, int, int]
+    ends: tuple[int, ...] = ()
+    round: int = 0
+    # Zobrist hash of all of the above, kept up to date by play/passed
+    key: int = 0
+
+    def __hash__(self):
+        return self.key
+
+    @classmethod
+    def start(cls, mine: int):
+        """ State at the start of a game given our hand's tile bits """
+        return cls(mine, (_ALL_TILES & ~mine,) * 3, (7, 7, 7))._with_key()
+
+    def _with_key(self):
+        return self._replace(key=position_key(
+            [self.tile_mask(tile) for tile in range(len(_TILES))], self.mine,
+            self.ends, self.hand_sizes, self.current_player()))
+
+    def tile_mask(self, tile: int) -> int:
+        """ Owner mask of the tile's zone, 0 when no opponent can have it """
+        mask = 0
+        for hand, tiles in enumerate(self.possible):
+            if tiles >> tile & 1:
+                mask |= 1 << hand
+        return mask
+
+    @classmethod
+    def from_game(cls, game: Game, mine: int = 0):
+        """ Snapshot of a Game. Game doesn't keep our hand apart from the
+        played tiles, so it has to be passed in as tile bits. """
+        dominoes = game._dominoes_state._all_dominoes
+        zones = game._zones_state._domino_to_zone
+        possible = tuple(sum(1 << t for t, domino in enumerate(dominoes)
+                             if zones[domino] and player in domino.possible_owners)
+                         for player in _PLAYER_BITS)
+        hand_sizes = tuple(game._players_state.get_player(i)[1].hand_size for i in range(1, 4))
+        return cls(mine, possible, hand_sizes,
+                   tuple(game._dominoes_state.active_ends), game._round)._with_key()
+
+    def current_player(self) -> int:
+        return self.round % 4
+
+    def play(self, tile: int, left: bool = True):
+        """ The current player plays the tile on the left or right end """
+        vals = _TILES[tile]
+        ends = list(self.ends)
+        side = 0 if left else 1
+        if not ends:
+            ends = list(vals)
+        elif vals[0] == ends[side]:
+            ends[side] = vals[1]
+        elif vals[1] == ends[side]:
+            ends[side] = vals[0]
+        else:
+            raise ValueError(f"Can't play {list(vals)} on {list(self.ends)}")
+
+        bit = 1 << tile
+        player = self.current_player()
+        key = self.key ^ ZONE_KEYS[tile][self.tile_mask(tile)] ^ ZONE_KEYS[tile][0] ^ \
+            ends_key(self.ends) ^ ends_key(ends) ^ \
+            TURN_KEYS[player] ^ TURN_KEYS[(player + 1) % 4]
+        if self.mine & bit:
+            key ^= MINE_KEYS[tile]
+        hand_sizes = self.hand_sizes
+        if player:
+            size = hand_sizes[player - 1]
+            key ^= HAND_KEYS[player - 1][size] ^ HAND_KEYS[player - 1][size - 1]
+            hand_sizes = hand_sizes[:player - 1] + (size - 1,) + hand_sizes[player:]
+        return GameState(self.mine & ~bit, tuple(tiles & ~bit for tiles in self.possible),
+                         hand_sizes, tuple(ends), self.round + 1, key)
+
+    def passed(self, numbers=None):
+        """ The current player passes, so they have nothing with the given
+        numbers (the open ends by default) """
+        player = self.current_player()
+        possible = self.possible
+        key = self.key ^ TURN_KEYS[player] ^ TURN_KEYS[(player + 1) % 4]
+        if player:
+            not_held = 0
+            for number in self.ends if numbers is None else numbers:
+                not_held |= _VALUE_MASKS[number]
+            # Every tile the player drops out of moves to a smaller zone
+            dropped = possible[player - 1] & not_held
+            while dropped:
+                low_bit = dropped & -dropped
+                dropped ^= low_bit
+                tile = low_bit.bit_length() - 1
+                mask = self.tile_mask(tile)
+                key ^= ZONE_KEYS[tile][mask] ^ ZONE_KEYS[tile][mask & ~(1 << (player - 1))]
+            possible = possible[:player - 1] + (possible[player - 1] & ~not_held,) + possible[player:]
+        return self._replace(possible=possible, round=self.round + 1, key=key)
+
+    def region_tiles(self):
+        """ Zone owner mask -> bitmask of the tiles in it """
+        regions = {}
+        for mask in _ZONE_MASKS.values():
+            tiles = _ALL_TILES
+            for hand, player_tiles in enumerate(self.possible):
+                tiles &= player_tiles if mask >> hand & 1 else ~player_tiles
+            regions[mask] = tiles
+        return regions
+
+    def signature(self):
+        """ Same as Statistics.signature for the position, so a GameState
+        can go straight into count_value_combinations_batch """
+        regions = self.region_tiles()
+        return (tuple((regions[_ZONE_MASKS[zone]].bit_count(),
+                       tuple((regions[_ZONE_MASKS[zone]] & _VALUE_MASKS[i]).bit_count()
+                             for i in range(7)))
+                      for zone in _Zone),
+                self.hand_sizes)
+
+
+def _final_stats(total_combinations, avoided, precision="exact"):
+    """ player -> value -> combinations where the player has the value,
+    from the combinations where they don't """
+    if precision == "log":
+        return {player: {i: log_subtract(total_combinations, avoided[hand][i]) for i in range(7)}
+                for hand, player in enumerate(_PLAYER_BITS)}
+    return {player: {i: total_combinations - avoided[hand][i] for i in range(7)}
+            for hand, player in enumerate(_PLAYER_BITS)}
+
+
+def _zone_distributions(region_sizes, held, total_combinations, precision="exact"):
+    """ count_value_deals' with_zones counts -> StatisticsResult.zones """
+    dealable = total_combinations != (-math.inf if precision == "log" else 0)
+    distributions = {}
+    for hand, player in enumerate(_PLAYER_BITS):
+        distributions[player] = {}
+        for zone in _PLAYER_ZONES[player]:
+            mask = _ZONE_MASKS[zone]
+            if not region_sizes[mask]:
+                # Nothing to hold, and the counter skips empty zones
+                counts = {0: total_combinations} if dealable else {}
+            else:
+                counts = held.get(mask, {}).get(hand, {})
+            chances = [(count, ratio(deals, total_combinations, precision))
+                       for count, deals in counts.items()]
+            distributions[player][zone] = tuple(sorted(chances,
+                                                       key=lambda item: (-item[1], item[0])))
+    return distributions
+
+
+def _layout(signature):
+    """ Statistics.signature() -> (region sizes, value counts, hand sizes) """
+    zones, hand_sizes = signature
+    region_sizes = {_ZONE_MASKS[zone]: size for zone, (size, _) in zip(_Zone, zones)}
+    value_counts = {_ZONE_MASKS[zone]: values for zone, (_, values) in zip(_Zone, zones)}
+    return region_sizes, value_counts, hand_sizes
+
+
+class StatisticsResult(NamedTuple):
+    """ What Statistics.calculate_probabilities works out for a position
+
+    Counts and chances are in the precision they were asked for (see
+    DealCounter.PRECISIONS): Fractions when exact, floats otherwise, with
+    `total` being a log in "log" precision.
+    """
+    # player -> value -> chance they have a domino with that value
+    values: dict
+    # player -> zone -> ((dominoes from the zone, chance), ...), most likely
+    # first, for every zone the player could be holding dominoes from
+    zones: dict
+    # Number of deals the chances are out of
+    total: int | float
+    precision: str = "exact"
+
+    def most_likely(self, player: _Player) -> dict:
+        """ zone -> how many of its dominoes the player most likely has """
+        return {zone: distribution[0][0]
+                for zone, distribution in self.zones[player].items() if distribution}
+
+
+# Called as trace(stage, details) by Statistics.calculate_probabilities
+type TraceHook = Callable[[str, dict], None]
+
+
 class Statistics:
-    def __init__(self, zones: ZonesState, player_states: PlayersState):
+    def __init__(self, zones: ZonesState, player_states: PlayersState,
+                 cache: StatsCache = None, table: DealTable = None,
+                 executor: Executor = None):
         self.zones = zones
         self.players = player_states
-
-    def zone_count(self, zone: _Zone, seen=0):
-        # print("zc", max(self.zone_size(zone) - seen, 1))
-        return self.zone_size(zone) - seen + 1
+        self.cache = cache
+        self.table = table
+        # Process pool for parallel_count_value_deals, worth it when a big
+        # batch of games is evaluated and the pool is shared between them
+        self.executor = executor
 
     def dominos_with_value(self, zone: _Zone, value: int):
-        return len([domino for domino in self.zones._all_zones[zone] if domino.has(value)])
+        return self.zones.count_with_value(zone, value)
 
     def zone_size(self, zone: _Zone):
         return len(self.zones._all_zones[zone])
 
-    def calculate_hand_range(self, total_round_count, zones):
-        # player -> range -> value (in fraction)
-        # player -> zone -> range -> value
-        value_counts = defaultdict(int)
-        value_counts_complement = defaultdict(int)
-        this_turn_ranges = {}
-        this_turn_ranges_complement = {}
-        if debug:
-            print("ROUNDROUNDROUND", total_round_count)
-        for zone, choose in zones.items():
-            if debug:
-                print("TOTAL FOR THIS ZONE - ", math.comb(
-                    self.zone_size(zone), choose), total_round_count, total_round_count / math.comb(
-                    self.zone_size(zone), choose))
-            if choose == 0:
+    def hand_sizes(self):
+        return tuple(self.players.get_player(i)[1].hand_size for i in range(1, 4))
+
+    def region_sizes(self, without: _Player = None, value: int = None):
+        """ Zone owner mask -> zone size, the way DealCounter expects it.
+
+        When `without` is given, every domino with `value` on it is moved
+        out of that player's reach, so counting deals on the result gives
+        the deals where that player has none of that number.
+        """
+        regions = defaultdict(int)
+        for zone in _Zone:
+            zone_size = self.zone_size(zone)
+            if without is None:
+                regions[_ZONE_MASKS[zone]] += zone_size
                 continue
-            for domino_val in range(0, 7):
-                if zone not in this_turn_ranges:
-                    this_turn_ranges[zone] = {}
-                    this_turn_ranges_complement[zone] = {}
-                total_zone_count = self.zone_size(zone)
-                if total_zone_count == 0:
+            val_zone_count = self.dominos_with_value(zone, value)
+            regions[_ZONE_MASKS[zone]] += zone_size - val_zone_count
+            regions[_ZONE_MASKS[zone] & ~_PLAYER_BITS[without]] += val_zone_count
+        return regions
+
+    def value_counts(self):
+        """ Zone owner mask -> how many of its dominoes have each value """
+        return {_ZONE_MASKS[zone]: tuple(self.dominos_with_value(zone, i) for i in range(7))
+                for zone in _Zone}
+
+    def signature(self):
+        """ Everything the counts depend on: each zone's size and how many
+        of its dominoes have each value, in zone order, plus the hand sizes """
+        return (tuple((self.zone_size(zone),
+                       tuple(self.dominos_with_value(zone, i) for i in range(7)))
+                      for zone in _Zone),
+                self.hand_sizes())
+
+    def count_value_combinations(self, precision="exact"):
+        """ Returns (player -> value -> combinations where the player has
+        at least one domino with that value, total combinations)
+
+        precision is "exact" for ints, "float" for float64 counts (faster
+        when NumPy is installed) or "log" for their natural logs, see
+        DealCounter.PRECISIONS.
+        """
+        # Read the zones once per query, everything after works off this
+        final_stats, total_combinations = self._cached_counts(precision, self.signature())
+        return {player: dict(counts) for player, counts in final_stats.items()}, total_combinations
+
+    def value_probabilities(self, precision="exact"):
+        """ player -> value -> chance the player has a domino with that
+        value. Fractions when exact, floats otherwise; "log" is the one to
+        use once the counts get too big for exact ints. """
+        final_stats, total_combinations = self.count_value_combinations(precision)
+        return {player: {i: ratio(count, total_combinations, precision)
+                         for i, count in counts.items()}
+                for player, counts in final_stats.items()}
+
+    def _cached_counts(self, precision, signature, with_zones=False):
+        """ _count_value_combinations through the cache. The zones are
+        cached under their own key, and working them out fills in the
+        plain counts' entry too. """
+        if self.cache is None:
+            return self._count_value_combinations(precision, signature, with_zones)
+        key = (signature, precision, "zones") if with_zones else (signature, precision)
+        cached = self.cache.get(key)
+        if cached is None:
+            cached = self._count_value_combinations(precision, signature, with_zones)
+            self.cache.put(key, cached)
+            if with_zones and (signature, precision) not in self.cache:
+                self.cache.put((signature, precision), cached[:2])
+        return cached
+
+    def _count_value_combinations(self, precision, signature, with_zones=False):
+        """ (final stats, total) for the signature, plus the zone
+        distributions when with_zones is set """
+        region_sizes, value_counts, hand_sizes = _layout(signature)
+        found = self._count_value_deals(region_sizes, value_counts, hand_sizes, precision,
+                                        with_zones)
+        total_combinations, avoided = found[:2]
+        counts = (_final_stats(total_combinations, avoided, precision), total_combinations)
+        if not with_zones:
+            return counts
+        return counts + (_zone_distributions(region_sizes, found[2], total_combinations, precision),)
+
+    def _count_value_deals(self, region_sizes, value_counts, hand_sizes, precision, with_zones):
+        """ count_value_deals through whichever backend this was made with """
+        # The table only has totals. The zone make-ups would need a pass of
+        # their own that costs more than the ones below, which get them
+        # together with the value counts
+        found = None
+        if self.table and not with_zones:
+            found = self.table.count_value_deals(region_sizes, value_counts, hand_sizes)
+        if found:
+            total_combinations, avoided = found
+            found = (from_exact(total_combinations, precision),
+                     [[from_exact(count, precision) for count in counts] for counts in avoided])
+        elif self.executor:
+            found = parallel_count_value_deals(
+                region_sizes, value_counts, hand_sizes, precision, executor=self.executor,
+                with_zones=with_zones)
+        else:
+            # Value counts and zone make-ups come out of the same pass
+            found = count_value_deals(region_sizes, value_counts, hand_sizes, precision,
+                                      with_zones=with_zones)
+        return found
+
+    def ownership_matrix(self):
+        """ Exact chance that each opponent holds each domino
+
+        One row per domino in DominoesState._all_dominoes order and one
+        column per opponent (players 1-3). Dominoes out of play or in our
+        hand get a row of zeros. Every domino in a zone is as likely as any
+        other in it to be dealt anywhere, so a row is just how many of that
+        zone's dominoes the player gets on average over its size.
+        """
+        hand_sizes = self.hand_sizes()
+        counter = DealCounter(self.region_sizes(), 3)
+        total_combinations = counter.count(hand_sizes)
+        split_counts = counter.region_split_counts(hand_sizes)
+
+        expected = {}
+        for zone in _Zone:
+            mask = _ZONE_MASKS[zone]
+            row = [Fraction(0)] * 3
+            for hand, player in enumerate(_PLAYER_BITS):
+                if not total_combinations or not self.zone_size(zone) or not mask >> hand & 1:
                     continue
-                val_zone_count = self.dominos_with_value(zone, domino_val)
-                tzc = math.comb(
-                    total_zone_count, choose)
-                this_turn_ranges[zone][domino_val] = (
-                    total_round_count - (math.comb(
-                        total_zone_count - val_zone_count, choose) *
-                        (total_round_count / tzc)))
-                this_turn_ranges_complement[zone][domino_val] = (
-                    math.comb(
-                        total_zone_count - val_zone_count, choose) *
-                    (total_round_count / tzc)
-                )
-        for domino_val in range(0, 7):
-            probabilities = []
-            probabilities_complement = []
-            for zone in this_turn_ranges:
-                if debug:
-                    print("Domino Val: ", domino_val,
-                          this_turn_ranges[zone][domino_val])
-                if this_turn_ranges[zone][domino_val] > 0:
-                    probabilities.append(
-                        Fraction(int(this_turn_ranges[zone][domino_val]), total_round_count))
-                    probabilities_complement.append(Fraction(
-                        int(this_turn_ranges_complement[zone][domino_val]), total_round_count))
-                    if debug:
-                        print("asdfasdfa", this_turn_ranges[zone][domino_val])
-                        print("asdfasdfa",
-                              this_turn_ranges_complement[zone][domino_val])
-                        print(total_round_count, "--------")
-            if len(probabilities) == 1:
-                value_counts[domino_val] = (
-                    (total_round_count / probabilities[0].denominator) *
-                    probabilities[0].numerator)
-                value_counts_complement[domino_val] = ((total_round_count / probabilities_complement[0].denominator) *
-                                                       probabilities_complement[0].numerator)
-            if len(probabilities) == 2:
-                l2res = UnionOf2(probabilities[0], probabilities[1])
-                l2resc = UnionOfN(probabilities_complement)
-                if debug:
-                    print("probs", probabilities)
-                    print("probs_complement", probabilities_complement)
-                value_counts[domino_val] = (
-                    (total_round_count / l2res.denominator) * l2res.numerator)
-                value_counts_complement[domino_val] = (
-                    (total_round_count / l2resc.denominator) * l2resc.numerator)
-                if debug:
-                    print(
-                        "HERERERE", value_counts[domino_val], value_counts_complement[domino_val])
-            if len(probabilities) == 3:
-                l3res = UnionOf3(
-                    probabilities[0], probabilities[1], probabilities[2])
-                l3resc = UnionOfN(probabilities_complement)
-                value_counts[domino_val] = (
-                    (total_round_count / l3res.denominator) * l3res.numerator)
-                value_counts_complement[domino_val] = (
-                    total_round_count / l3resc.denominator) * l3resc.numerator
-            if len(probabilities) == 4:
-                l4res = UnionOf4(probabilities[0], probabilities[1],
-                                 probabilities[2], probabilities[3])
-                l4resc = UnionOfN(probabilities_complement)
-                value_counts[domino_val] = (
-                    (total_round_count / l4res.denominator) * l4res.numerator)
-                value_counts_complement[domino_val] = (
-                    total_round_count / l4resc.denominator) * l4resc.numerator
-
-        return value_counts, value_counts_complement
-
-    def calculate_probabilities_for_player(self, player: Player):
-        def comb(s, chose):
-            return max(math.comb(s, chose), 1)
-        total_combinations = 0
-        final_stats = {
-            _Player.PLAYER_1: {i: 0 for i in range(7)},
-            _Player.PLAYER_2: {i: 0 for i in range(7)},
-            _Player.PLAYER_3: {i: 0 for i in range(7)}
-        }
+                owner = [i for i in range(3) if mask >> i & 1].index(hand)
+                held = sum(split[owner] * deals for split, deals in split_counts.get(mask, {}).items())
+                row[hand] = Fraction(held, total_combinations * self.zone_size(zone))
+            expected[zone] = row
+
+        return [expected[zone][::] if zone else [Fraction(0)] * 3
+                for zone in self.zones._domino_to_zone.values()]
+
+    def region_tiles(self):
+        """ Zone owner mask -> bitmask of the dominoes in it, bit i being
+        the i-th domino of DominoesState._all_dominoes """
+        bits = {domino: 1 << i for i, domino in enumerate(self.zones._domino_to_zone)}
+        return {_ZONE_MASKS[zone]: sum(bits[domino] for domino in self.zones._all_zones[zone])
+                for zone in _Zone}
+
+    def sample_value_probabilities(self, draws: int, seed: int = None,
+                                   confidence: float = 0.95):
+        """ Monte Carlo version of count_value_combinations for when exact
+        counting is too slow. Draws `draws` deals uniformly and returns
+        player -> value -> (estimate, low, high) of the chance the player
+        has a domino with that value, low/high being the confidence
+        interval around the estimate. """
+        sampler = DealSampler(self.region_tiles(), self.hand_sizes(), seed)
+        value_masks = [sum(1 << i for i, domino in enumerate(self.zones._domino_to_zone)
+                           if domino.has(value)) for value in range(7)]
+        hits = [[0] * 7 for _ in _PLAYER_BITS]
+        for deal in sampler.samples(draws):
+            for hand, tiles in enumerate(deal):
+                for value, value_mask in enumerate(value_masks):
+                    if tiles & value_mask:
+                        hits[hand][value] += 1
+        return {player: {value: proportion_interval(hits[hand][value], draws, confidence)
+                         for value in range(7)}
+                for hand, player in enumerate(_PLAYER_BITS)}
+
+    def calculate_probabilities(self, precision="exact", trace: TraceHook = None):
+        """ Chance of every player having each value and of every zone
+        make-up, out of every deal of the unknown dominoes
+
+        Doesn't print or change anything. `trace` is called with each
+        stage's counts for anyone who wants to follow along, and nothing
+        is built for it when it's None.
+        """
+        signature = self.signature()
+        final_stats, total_combinations, zones = self._cached_counts(
+            precision, signature, with_zones=True)
+        if trace is not None:
+            trace("value_counts", {"final_stats": final_stats, "total": total_combinations,
+                                   "signature": signature})
+        values = {player: {i: ratio(count, total_combinations, precision)
+                           for i, count in counts.items()}
+                  for player, counts in final_stats.items()}
+        if trace is not None:
+            trace("zone_distributions", {"zones": zones})
+        return StatisticsResult(values, {player: dict(distributions)
+                                         for player, distributions in zones.items()},
+                                total_combinations, precision)
+
+
+class IncrementalStatistics(Statistics):
+    """ Statistics that follows the zones as the game goes on
+
+    The counts come out of one IncrementalValueDeals, which keeps the
+    count_value_deals tables from before every zone and only deals again
+    the zones from the first one whose dominoes changed. The zone everybody
+    shares goes last: most moves only take a domino out of it, and then
+    it's the only zone dealt again.
+    """
+
+    _ORDER = [_ZONE_MASKS[zone] for zone in (
+        _Zone.ZONE_1, _Zone.ZONE_2, _Zone.ZONE_3,
+        _Zone.ZONE_12, _Zone.ZONE_13, _Zone.ZONE_23, _Zone.ZONE_123)]
+
+    def __init__(self, zones: ZonesState, player_states: PlayersState,
+                 cache: StatsCache = None):
+        super().__init__(zones, player_states, cache)
+        self._deals = IncrementalValueDeals(self._ORDER, 3)
+
+    def _count_value_deals(self, region_sizes, value_counts, hand_sizes, precision, with_zones):
+        return self._deals.count(region_sizes, value_counts, hand_sizes, precision, with_zones)
+
+
+def count_value_combinations_batch(states, precision="exact", cache: StatsCache = None):
+    """ Statistics.count_value_combinations for a whole batch of positions
+
+    states are Statistics objects, GameStates or their signature(), which
+    is all the counts depend on and is cheap to keep for every position of
+    a logged game. Returns one (final_stats, total_combinations) per state, in
+    order. Repeated positions are counted once, the zone splits worked out
+    for one position are reused by the others (see batch_count_value_deals)
+    and with a cache only the positions it hasn't seen get counted.
+    """
+    signatures = [state.signature() if isinstance(state, (Statistics, GameState)) else state
+                  for state in states]
+    results = {}
+    missing = []
+    for signature in dict.fromkeys(signatures):
+        cached = cache.get((signature, precision)) if cache is not None else None
+        if cached is None:
+            missing.append(signature)
+        else:
+            results[signature] = cached
+    counts = batch_count_value_deals([_layout(signature) for signature in missing], precision)
+    for signature, (total_combinations, avoided) in zip(missing, counts):
+        results[signature] = (_final_stats(total_combinations, avoided, precision),
+                              total_combinations)
+        if cache is not None:
+            cache.put((signature, precision), results[signature])
+    return [({player: dict(counts) for player, counts in results[signature][0].items()},
+             results[signature][1])
+            for signature in signatures]
 
-        for p1_from_z12 in range(self.zone_count(_Zone.ZONE_12)):
-            for p1_from_z13 in range(self.zone_count(_Zone.ZONE_13)):
-                for p1_from_z123 in range(self.zone_count(_Zone.ZONE_123)):
-                    _, p1_stats = self.players.get_player(1)
-                    remaining_h1 = p1_stats.hand_size - p1_from_z12 - p1_from_z13 - p1_from_z123
-                    if remaining_h1 < 0 or remaining_h1 > len(self.zones._all_zones[_Zone.ZONE_1]):
-                        continue
-                    # finish implementing the rest of the algorithm, and then look through the combinations for each player
-                    # calculate the combinations
-                    for p2_from_z12 in range(self.zone_count(_Zone.ZONE_12, p1_from_z12)):
-                        for p2_from_z23 in range(self.zone_count(_Zone.ZONE_23)):
-                            for p2_from_z123 in range(self.zone_count(_Zone.ZONE_123, p1_from_z123)):
-                                _, p2_stats = self.players.get_player(2)
-                                _, p3_stats = self.players.get_player(3)
-                                remaining_h2 = p2_stats.hand_size - p2_from_z12 - p2_from_z23 - p2_from_z123
-                                if remaining_h2 < 0 or remaining_h2 > self.zone_size(_Zone.ZONE_2):
-                                    continue
-                                if p3_stats.hand_size > len(self.zones.player_to_dominoes(_Player.PLAYER_3)) - p1_from_z13 - p2_from_z23 - p1_from_z123 - p2_from_z123:
-                                    continue
-                                combinations_h1 = comb(self.zone_size(_Zone.ZONE_12), p1_from_z12) * comb(self.zone_size(_Zone.ZONE_13), p1_from_z13) * comb(
-                                    self.zone_size(_Zone.ZONE_123), p1_from_z123) * comb(self.zone_size(_Zone.ZONE_1), remaining_h1)
-                                p1combination = {_Zone.ZONE_12: p1_from_z12, _Zone.ZONE_13: p1_from_z13,
-                                                 _Zone.ZONE_123: p1_from_z123, _Zone.ZONE_1: remaining_h1}
-                                combinations_h2 = comb(self.zone_size(_Zone.ZONE_12) - p1_from_z12, p2_from_z12) * comb(self.zone_size(_Zone.ZONE_23), p2_from_z23) * comb(
-                                    self.zone_size(_Zone.ZONE_123) - p1_from_z123, p2_from_z123) * comb(self.zone_size(_Zone.ZONE_2), remaining_h2)
-                                combinations_h3 = comb(len(self.zones.player_to_dominoes(
-                                    _Player.PLAYER_3)) - p1_from_z13 - p2_from_z23 - p1_from_z123 - p2_from_z123, p3_stats.hand_size)
-                                p3_from_z13 = self.zone_size(
-                                    _Zone.ZONE_13) - p1_from_z13
-                                p3_from_z23 = self.zone_size(
-                                    _Zone.ZONE_23) - p2_from_z23
-                                p3_from_z123 = self.zone_size(
-                                    _Zone.ZONE_123) - p1_from_z123 - p2_from_z123
-                                remaining_h3 = len(self.zones.player_to_dominoes(_Player.PLAYER_3)) - p1_from_z13 - \
-                                    p2_from_z23 - p1_from_z123 - p2_from_z123 - \
-                                    p3_from_z123 - p3_from_z13 - p3_from_z23
-                                print(self.zone_size(_Zone.ZONE_123),
-                                      p1_from_z13, p2_from_z123, p3_from_z123)
-                                # p2 combination stats
-                                p2combination = {_Zone.ZONE_12: p2_from_z12, _Zone.ZONE_23: p2_from_z23,
-                                                 _Zone.ZONE_123: p2_from_z123, _Zone.ZONE_2: remaining_h2}
-                                # p3 combination stats
-                                p3combination = {_Zone.ZONE_13: p3_from_z13, _Zone.ZONE_23: p3_from_z23,
-                                                 _Zone.ZONE_123: p3_from_z123, _Zone.ZONE_3: remaining_h3}
-                                total_combinations += combinations_h1 * combinations_h2 * combinations_h3
-                                this_round_combinations = combinations_h1 * combinations_h2 * combinations_h3
-
-                                _, p1_combinations_complement = self.calculate_hand_range(
-                                    this_round_combinations, p1combination)
-                                _, p2_combinations_complement = self.calculate_hand_range(
-                                    this_round_combinations, p2combination)
-                                _, p3_combinations_complement = self.calculate_hand_range(
-                                    this_round_combinations, p3combination)
-                                for curr_player, player_stats_result in {_Player.PLAYER_1: p1_combinations_complement,
-                                                                         _Player.PLAYER_2: p2_combinations_complement,
-                                                                         _Player.PLAYER_3: p3_combinations_complement}.items():
-                                    for val, count in player_stats_result.items():
-                                        final_stats[curr_player][val] += this_round_combinations - count
-
-                                if debug:
-                                    print("isaac", p1combination)
-                                    print("isaac", p2combination)
-                                    print("isaac", p3combination)
-
-                                    # print("value_combinations", {val: (count/total_combinations) * 100 for val, count in value_combinations_p1.items()})
-                                    print("complements p1- ", {val: [(1 - (count/this_round_combinations)) * 100,
-                                          this_round_combinations - count] for val, count in p1_combinations_complement.items()})
-                                    print("complements p2- ", {val: [(1 - (count/this_round_combinations)) * 100,
-                                          this_round_combinations - count] for val, count in p2_combinations_complement.items()})
-                                    print("complements p3- ", {val: [(1 - (count/this_round_combinations)) * 100,
-                                          this_round_combinations - count] for val, count in p3_combinations_complement.items()})
-
-
-        for player in final_stats:
-            print({valll: (counttt/total_combinations)*100 for valll,
-                  counttt in final_stats[player].items()})
-        print("here", total_combinations)
-        print("other way: ", )
+
+def print_probabilities(result: StatisticsResult):
+    for player, chances in result.values.items():
+        print(player, {value: round(float(chance) * 100, 2) for value, chance in chances.items()})
+    print("total", result.total)
 
 
 def main():
@@ -488,7 +922,7 @@ def main():
     _all_dominoes = _game._dominoes_state._all_dominoes
 
     stats = Statistics(_game._zones_state, _game._players_state)
-    stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    print_probabilities(stats.calculate_probabilities())
     # _game.play_left(_all_dominoes[27])  # 6/6
     # _game.print_dominos_in_play()
 
@@ -496,33 +930,33 @@ def main():
     # _game.play_right(_all_dominoes[21])  # 6/6
     # _game.play_left(_all_dominoes[2])  # 6/6
 
-    # stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    # print_probabilities(stats.calculate_probabilities())
 
     # _game.play_right(_all_dominoes[9])  # 6/6
     # _game.play_right(_all_dominoes[1])  # 6/6
     # _game.play_left(_all_dominoes[13])  # 6/6
     # _game.play_left(_all_dominoes[8])  # 6/6
 
-    # stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    # print_probabilities(stats.calculate_probabilities())
 
     # _game.play_right(_all_dominoes[0])  # 6/6
     # _game.play_right(_all_dominoes[3])  # 6/6
     # _game.play_left(_all_dominoes[10])  # 6/6
     # _game.play_left(_all_dominoes[4])  # 6/6
 
-    # stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    # print_probabilities(stats.calculate_probabilities())
 
     # _game.play_right(_all_dominoes[18])  # 6/6
     # _game.play_right(_all_dominoes[19])  # 6/6
     # _game.play_right(_all_dominoes[23])  # 6/6
     # _game.play_left(_all_dominoes[5])  # 6/6
-    # stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    # print_probabilities(stats.calculate_probabilities())
 
     # _game.play_left(_all_dominoes[16])  # 6/6
     # _game.play_left(_all_dominoes[15])  # 6/6
     # _game.play_right(_all_dominoes[25])  # 6/6
     # _game.play_right(_all_dominoes[11])  # 6/6
-    # stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    # print_probabilities(stats.calculate_probabilities())
 
 
 
@@ -536,7 +970,7 @@ def main():
     # _game.player_passed([5,0]) # skip
     # _game.player_passed([5,0]) # skip
 
-    # stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    # print_probabilities(stats.calculate_probabilities())
     # _game.print_dominos_in_play()
     # _game._zones_state.print_zones()
 
@@ -545,13 +979,13 @@ def main():
     # _game.play_right(_all_dominoes[7]) # skip
     # _game.play_left(_all_dominoes[14]) # 6/6
 
-    # stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    # print_probabilities(stats.calculate_probabilities())
     # _game.print_dominos_in_play()
     # _game._zones_state.print_zones()
 
     # _game.player_passed([1,2]) # skip
     # _game._zones_state.print_zones()
-    # stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    # print_probabilities(stats.calculate_probabilities())
     # # _game.print_current_player() # p2
     # _game.play_left(_all_dominoes[-1]) # 6/6
     # _game._zones_state.print_zones()
@@ -588,7 +1022,7 @@ def main():
     # _game.player_passed([3,6]) # skip
     # # _game._zones_state.print_zones()
 
-    # stats.calculate_probabilities_for_player(_Player.PLAYER_1)
+    # print_probabilities(stats.calculate_probabilities())
 
 
 """
@@ -740,44 +1174,6 @@ Algorithms:
 #     print(this_turn_ranges)
 
 
-def Certain(*fractions: Fraction):
-    for fraction in fractions:
-        if fraction > 1:
-            return True
-    return False
-
-
-def UnionOf2(a: Fraction, b: Fraction):
-    if Certain(a, b):
-        return max(a.denominator, b.denominator)
-    return a + b - (a * b)
-
-
-def UnionOf3(a: Fraction, b: Fraction, c: Fraction):
-    if Certain(a, b, c):
-        return max(a.denominator, b.denominator, c.denominator)
-    return a + b + c - (a * b) - (a * c) - (b * c) + (a * b * c)
-
-
-def UnionOf4(a: Fraction, b: Fraction, c: Fraction, d: Fraction):
-    if Certain(a, b, c, d):
-        return max(a.denominator, b.denominator,
-                   c.denominator, d.denominator)
-    return (a + b + c + d -
-            (a * b) - (a * c) - (a * d) - (b * c) - (b * d) - (c * d)
-            + (a * b * c) + (a * b * d) + (a * c * d) + (b * c * d) -
-            (a * b * c * d))
-
-
-def UnionOfN(probabilities):
-    product = 1
-    for probability in probabilities:
-        product *= probability
-    if debug:
-        print("The complement product - ", product)
-    return product
-
-
 def yield_test(A, B, C):
     for a in range(A):
         for b in range(B):
@@ -786,8 +1182,9 @@ def yield_test(A, B, C):
 
 
 
-main()
-
-
 def iterate_through_subsets():
     pass
+
+
+if __name__ == "__main__":
+    main()
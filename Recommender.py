@@ -0,0 +1,205 @@
+""" Recommender.py
+
+Turns the statistics into a move: an expectimax search over GameStates
+from our seat (player 0).
+
+On our turns we pick the best move. On an opponent's turn the search
+doesn't know their hand, so it's a chance node weighted by the counts:
+  - they pass with the chance that they have nothing for either open end,
+    which is the deals with those tiles kept out of their hand over all
+    the deals
+  - otherwise they play one of the tiles that fit, each weighted by the
+    chance they hold it (see Statistics.ownership_matrix), split between
+    the two ends when it fits both
+Passing also tells everybody what they don't have, which GameState.passed
+already takes care of, so the probabilities further down the tree use it.
+
+Searches deepen one ply at a time until the time budget runs out, so the
+answer from the last finished depth is always there to return. Values
+are kept in a transposition table keyed on the states' Zobrist hashes,
+so positions reached through different move orders are only searched
+once per depth.
+"""
+
+import time
+from collections import defaultdict
+
+from DealCounter import DealCounter, count_value_deals
+from Dominoes import GameState, _TILES, _VALUE_MASKS
+from StatsCache import StatsCache
+from Zobrist import TranspositionTable, mine_key
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def legal_moves(hand: int, ends: tuple[int, ...]) -> list[tuple[int, bool]]:
+    """ (tile, left) for every tile in the hand bitmask that fits an end.
+    When both ends show the same number only the left one is listed. """
+    moves = []
+    while hand:
+        low_bit = hand & -hand
+        hand ^= low_bit
+        tile = low_bit.bit_length() - 1
+        if not ends:
+            moves.append((tile, True))
+            continue
+        if ends[0] in _TILES[tile]:
+            moves.append((tile, True))
+        if ends[1] in _TILES[tile] and ends[1] != ends[0]:
+            moves.append((tile, False))
+    return moves
+
+
+def _region_sizes(region_tiles: dict[int, int], hand: int = None,
+                  not_held: int = 0) -> dict[int, int]:
+    """ Zone sizes, with the tiles in not_held moved out of hand's reach """
+    sizes = defaultdict(int)
+    for mask, tiles in region_tiles.items():
+        if hand is not None and mask >> hand & 1:
+            moved = (tiles & not_held).bit_count()
+            sizes[mask & ~(1 << hand)] += moved
+            sizes[mask] += tiles.bit_count() - moved
+        else:
+            sizes[mask] += tiles.bit_count()
+    return sizes
+
+
+def evaluate(state: GameState) -> float:
+    """ Score in [-1, 1] from our side: 1 when we're out, -1 when an
+    opponent is, otherwise how far ahead of the closest opponent we are in
+    tiles, with a nudge for fewer pips left in our hand """
+    ours = state.mine.bit_count()
+    if not ours:
+        return 1.0
+    if not all(state.hand_sizes):
+        return -1.0
+    pips = sum(sum(_TILES[tile]) for tile in range(len(_TILES)) if state.mine >> tile & 1)
+    return 0.8 * (min(state.hand_sizes) - ours) / 7 - 0.1 * pips / 84
+
+
+class MoveRecommender:
+    """ Ranks our moves by expectimax value
+
+    Search values and chance weights are kept between calls, so one
+    recommender should be kept for a whole game and they carry over from
+    move to move.
+    """
+
+    def __init__(self, table: TranspositionTable = None, chances: StatsCache = None):
+        self.table = table if table is not None else TranspositionTable()
+        self.chances = chances if chances is not None else StatsCache(max_entries=50_000)
+        self.nodes = 0
+        self.depth = 0
+        self._deadline = None
+
+    def recommend(self, state: GameState, time_budget: float = 1.0,
+                  max_depth: int = 28) -> list[tuple[int, bool, float]]:
+        """ Returns (tile, left, value) for every legal move, best first,
+        from the deepest search that finished within time_budget seconds.
+        An empty list means we have to pass. """
+        if state.current_player() != 0:
+            raise ValueError("Moves can only be recommended on our turn")
+        self._deadline = time.perf_counter() + time_budget
+        self.nodes = 0
+        self.table.new_search()
+        moves = legal_moves(state.mine, state.ends)
+        ranked = sorted(((evaluate(state.play(*move)), move) for move in moves), reverse=True)
+        self.depth = 0
+        for depth in range(1, max_depth + 1):
+            try:
+                ranked = sorted(((self._value(state.play(*move), depth - 1), move)
+                                 for _, move in ranked), reverse=True)
+            except _OutOfTime:
+                break
+            self.depth = depth
+        return [(tile, left, value) for value, (tile, left) in ranked]
+
+    def _value(self, state: GameState, depth: int) -> float:
+        if not state.mine or not all(state.hand_sizes) or not depth:
+            return evaluate(state)
+        self.nodes += 1
+        if time.perf_counter() > self._deadline:
+            raise _OutOfTime()
+        value = self.table.get(state.key, depth)
+        if value is not None:
+            return value
+
+        if state.current_player() == 0:
+            moves = legal_moves(state.mine, state.ends)
+            value = max((self._value(state.play(*move), depth - 1) for move in moves),
+                        default=None)
+            if value is None:
+                value = self._value(state.passed(), depth - 1)
+        else:
+            outcomes = self.chance_outcomes(state)
+            value = sum(chance * self._value(next_state, depth - 1)
+                        for chance, next_state in outcomes) if outcomes else evaluate(state)
+        self.table.put(state.key, depth, value)
+        return value
+
+    def chance_outcomes(self, state: GameState) -> list[tuple[float, GameState]]:
+        """ (chance, next state) for everything the opponent to move can do """
+        # Our hand doesn't change the odds, so positions that only differ
+        # in it share their chances: the key is the Zobrist hash without it
+        key = state.key ^ mine_key(state.mine)
+        outcomes = self.chances.get(key)
+        if outcomes is not None:
+            return [(chance, state.play(*move) if move else state.passed())
+                    for chance, move in outcomes]
+
+        hand = state.current_player() - 1
+        region_tiles = state.region_tiles()
+        total, shares = self._holding_shares(region_tiles, state.hand_sizes)
+        outcomes = []
+        if total:
+            pass_chance = 0.0
+            if state.ends:
+                fits = _VALUE_MASKS[state.ends[0]] | _VALUE_MASKS[state.ends[1]]
+                passes = DealCounter(_region_sizes(region_tiles, hand, fits), 3)
+                pass_chance = passes.count(state.hand_sizes) / total
+            if pass_chance:
+                outcomes.append((pass_chance, None))
+
+            zone_of = {tile: mask for mask, tiles in region_tiles.items()
+                       for tile in range(len(_TILES)) if tiles >> tile & 1}
+            moves = legal_moves(state.possible[hand], state.ends)
+            # A tile that fits both ends is played on either, so each side
+            # gets half the chance of holding it
+            sides = defaultdict(int)
+            for tile, _ in moves:
+                sides[tile] += 1
+            plays = [(move, shares[hand].get(zone_of[move[0]], 0.0) / sides[move[0]])
+                     for move in moves]
+            weight = sum(chance for _, chance in plays)
+            if weight:
+                outcomes += [((1 - pass_chance) * chance / weight, move)
+                             for move, chance in plays if chance]
+        self.chances.put(key, outcomes)
+        return [(chance, state.play(*move) if move else state.passed())
+                for chance, move in outcomes]
+
+    def _holding_shares(self, region_tiles: dict[int, int], hand_sizes: tuple[int, ...]):
+        """ (deals, hand -> zone -> chance the hand holds any one tile of
+        the zone), the chance being the zone's average share for the hand
+
+        It only depends on the zone sizes and hand sizes, which our own
+        moves don't change, so it's cached on those next to the chances.
+        """
+        region_sizes = _region_sizes(region_tiles)
+        key = (tuple(sorted(region_sizes.items())), hand_sizes)
+        found = self.chances.get(key)
+        if found is not None:
+            return found
+        total, _, held = count_value_deals(region_sizes, {}, hand_sizes, "float",
+                                           with_zones=True)
+        shares = [{} for _ in hand_sizes]
+        if total:
+            for mask, hands in held.items():
+                for hand, counts in hands.items():
+                    shares[hand][mask] = sum(x * deals for x, deals in counts.items()) / \
+                        (total * region_sizes[mask])
+        found = (total, shares)
+        self.chances.put(key, found)
+        return found
@@ -0,0 +1,83 @@
+""" StatsCache.py
+
+A least recently used cache for probability tables. Replayed games keep
+landing on the same zone sizes/hand sizes, so Statistics can look the
+whole per-player table up by its signature instead of counting again.
+"""
+
+import sys
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+def approximate_size(value: Any) -> int:
+    """ Rough number of bytes a (nested) table of dicts/tuples/ints takes """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(key) + approximate_size(val)
+                    for key, val in value.items())
+    elif isinstance(value, (tuple, list)):
+        size += sum(approximate_size(val) for val in value)
+    return size
+
+
+class StatsCache:
+    """ LRU cache with an entry cap and a memory cap
+
+    Both caps are enforced on every put by evicting the least recently used
+    entries. Hits, misses and evictions are counted so a long batch run can
+    tell whether the cache is pulling its weight.
+    """
+
+    def __init__(self, max_entries: int = 100_000,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_used = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Any:
+        """ Returns the cached value or None, marking it as recently used """
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key: Hashable, value: Any):
+        """ Stores the value, evicting old entries to stay under the caps """
+        if key in self._entries:
+            self.bytes_used -= self._entries.pop(key)[1]
+        size = approximate_size(key) + approximate_size(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.bytes_used += size
+        while len(self._entries) > self.max_entries or \
+                self.bytes_used > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes_used -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes_used = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self):
+        return (f"StatsCache(entries={len(self)}, bytes={self.bytes_used}, "
+                f"hits={self.hits}, misses={self.misses}, "
+                f"evictions={self.evictions})")
@@ -12,11 +12,16 @@ from collections import defaultdict
 from typing import Any, Iterator
 from itertools import combinations
 
+from Binomials import comb
+from Compositions import bounded_compositions
+
 type VennSetName = str | tuple[str, ...]
 type GraphSet = dict[str, 'VennSet']
 
 
-ALLOWED_VENN_GRAPH_SIZES = [2, 3]
+# One set per unknown hand, a 2^N - 1 region graph. Capped so the
+# DealCounter recursion stays well under the interpreter's limit.
+ALLOWED_VENN_GRAPH_SIZES = range(2, 7)
 
 class VennSet:
     def __init__(self, name: VennSetName):
@@ -97,7 +102,7 @@ class VennGraph:
                                 names: list[VennSetName]) -> GraphSet:
         """ Creates VennSet objects from list of names """
         if len(names) not in ALLOWED_VENN_GRAPH_SIZES:
-            raise ValueError("Can only create VennGraph for 2 or 3 sets")
+            raise ValueError("Can only create VennGraph for 2 to 6 sets")
 
         set_names_by_level = self._generate_intersection_names(names)
 
@@ -227,7 +232,10 @@ class VennGraph:
             yield val.val
 
     def size(self, inclusive:bool, *names: VennSetName) -> int:
-        """ Returns the size of the current"""
+        """ Returns the size of the given set. `inclusive` is passed on as
+        VennSet.size's `strict`: True counts only the elements in exactly
+        this set ("A" alone), False also counts the ones in the sets that
+        include it ("A", "AB", "AC", "ABC", see get_sets) """
         return self._get_set_from_names(names).size(inclusive)
 
     def get_sets(self, *names: VennSetName)->Iterator[VennSet]:
@@ -242,6 +250,162 @@ class VennGraph:
         return {child: self._get_set_from_names(child).size() for child in child_sets if child != names}
 
 
+class BitmaskVennGraph:
+    """ VennGraph backed by integer bitmasks
+
+    Same public API as VennGraph, but every element gets a fixed index
+    the first time it's seen and each set is stored as an int with one
+    bit per element index. Moving an element between sets is two bit
+    flips, sizes are popcounts and membership is a single bit test, so
+    nothing scans a list and nothing gets wrapped in a VennElem.
+    """
+
+    def __init__(self, *names: str):
+        self.parent_sets: list[VennSetName] = list(sorted(names))
+        self.sets: dict[VennSetName, int] = \
+            self._create_sets_from_names(self.parent_sets)
+        self._descendants: dict[VennSetName, list[VennSetName]] = {
+            name: [other for other in self.sets
+                   if set(name) <= set(other)]
+            for name in self.sets
+        }
+        self._element_index: dict[Any, int] = {}
+        self._elements: list[Any] = []
+        self._element_set: list[VennSetName | None] = []
+
+    def _create_sets_from_names(
+            self, names: list[VennSetName]) -> dict[VennSetName, int]:
+        """ Creates an empty mask for every intersection of the names """
+        if len(names) not in ALLOWED_VENN_GRAPH_SIZES:
+            raise ValueError("Can only create VennGraph for 2 to 6 sets")
+
+        return {set_name: 0 for i in range(1, len(names)+1)
+                for set_name in combinations(names, i)}
+
+    def _get_name(self, names: list[VennSetName]) -> VennSetName:
+        """ Returns the key of the set matching the names or throws """
+
+        hashed_name = tuple(sorted(names))
+        if hashed_name not in self.sets:
+            raise ValueError(
+                f"Given set {hashed_name} does not exist in graph\n" +
+                f"Set names are {'-'.join(str(name) for name in self.sets)}")
+
+        return hashed_name
+
+    def _register_and_get(self, elem: Any) -> int:
+        """ Returns the bit index of the element, assigning one if new """
+        if elem not in self._element_index:
+            self._element_index[elem] = len(self._elements)
+            self._elements.append(elem)
+            self._element_set.append(None)
+        return self._element_index[elem]
+
+    def _move(self, index: int, name: VennSetName | None):
+        """ Moves the element at index out of its set and into name """
+        bit = 1 << index
+        curr_name = self._element_set[index]
+        if curr_name is not None:
+            self.sets[curr_name] &= ~bit
+        if name is not None:
+            self.sets[name] |= bit
+        self._element_set[index] = name
+
+    def add_to_set(self, elems: [Any], *names: VennSetName):
+        """ Adds elements to the set matching the union of the given sets
+
+            See VennGraph.add_to_set
+        """
+        for elem in elems:
+            index = self._register_and_get(elem)
+            curr_name = self._element_set[index]
+            owners = set(names) | set(curr_name or ())
+            self._move(index, self._get_name(list(owners)))
+
+    def put_in_set(self, elems: [Any], *names: VennSetName):
+        """ Moves elements to set matching the intersection of the names """
+        name = self._get_name(list(names))
+        for elem in elems:
+            self._move(self._register_and_get(elem), name)
+
+    def remove_from_set(self, elems: [Any],
+                        names: [VennSetName]):
+        """ Removes an element from the sets provided
+
+            See VennGraph.remove_from_set
+        """
+        for elem in elems:
+            index = self._element_index.get(elem)
+            if index is None or self._element_set[index] is None:
+                continue
+            curr_name = self._element_set[index]
+            removed = self._get_name(list(names)) if names else curr_name
+            new_name = set(curr_name) - set(removed)
+            self._move(index, self._get_name(list(new_name))
+                       if new_name else None)
+
+    def remove_from_graph(self, elems: [Any]):
+        """ Removes an element from the venn diagram """
+        for elem in elems:
+            index = self._element_index.get(elem)
+            if index is not None:
+                self._move(index, None)
+
+    def contains_element(self, elem: Any, *names: VennSetName) -> bool:
+        """ Returns whether the element is in the given set """
+        index = self._element_index.get(elem)
+        if index is None:
+            return False
+        return bool(self.sets[self._get_name(list(names))] >> index & 1)
+
+    def get_set_name(self, elem: Any) -> VennSetName | None:
+        """ Returns the name of the set the element is currently in """
+        index = self._element_index.get(elem)
+        return None if index is None else self._element_set[index]
+
+    def get_mask(self, *names: VennSetName) -> int:
+        """ Returns the raw bitmask of the given set """
+        return self.sets[self._get_name(list(names))]
+
+    def get_element(self, index: int) -> Any:
+        """ Returns the element that owns the given bit index """
+        return self._elements[index]
+
+    def get_elements_in_set(self, *names: VennSetName):
+        """ Returns all elements in given set """
+        mask = self.get_mask(*names)
+        while mask:
+            low_bit = mask & -mask
+            yield self._elements[low_bit.bit_length() - 1]
+            mask ^= low_bit
+
+    def size(self, inclusive: bool, *names: VennSetName) -> int:
+        """ Returns the size of the given set. Same convention as
+        VennGraph.size, where `inclusive` is VennSet.size's `strict`: True
+        counts only the elements in exactly this set ("A" alone), False
+        also counts the ones in the sets that include it ("A", "AB", "AC",
+        "ABC", see get_sets) """
+        name = self._get_name(list(names))
+        if inclusive:
+            return self.sets[name].bit_count()
+        mask = 0
+        for child in self._descendants[name]:
+            mask |= self.sets[child]
+        return mask.bit_count()
+
+    def get_sets(self, *names: VennSetName) -> list[VennSetName]:
+        """ The names of the sets that include the given set
+            ex: sets("A") -> ("A", "AB", "AC", "ABC")
+        """
+        return list(self._descendants[self._get_name(list(names))])
+
+    def get_subset_sizes(self, *names: VennSetName):
+        """ Returns a dict of the subset name to size of the subset"""
+        name = self._get_name(list(names))
+        return {child: self.sets[child].bit_count()
+                for child in self._descendants[name] if child != name}
+
+
 
 
 class Domino:
@@ -291,73 +455,115 @@ three_set_venn_diagram.remove_from_graph([all_dominoes[0]])
 #           f'value: {set_object.values}')
 
 
-class GraphAction:
-    """IDK, a number and a zone in the graph, a group name, to modify the graph"""
-    pass
-
 # Subpartition?
 class SubPartition:
-    """ IDK - a partition is a way to build the whole set by chunks? In this case
-    we care about the composition of the whole set by which components
-    of which subsets were used. I want this class to refer to one group's make
-    up. The chunk in reference to subsets that make up one group's part
-    of the partition. So I think subpartition might be a better name. """
-    pass
-
-def get_subpartitions(group_name: VennSetName, state: VennGraph, handsize: int) -> [SubPartition]:
+    """ One group's part of a partition: how many elements it takes from
+    each set it can reach. A partition is a way to build the whole set out
+    of chunks, and this is the chunk one group ends up with.
+
+    The group's own set (the elements only it can take) is always taken
+    whole, since nobody else can take them and nothing is left over.
+    """
+
+    def __init__(self, group: VennSetName, takes: dict[VennSetName, int]):
+        self.group = group
+        self.takes = takes
+
+    def size(self) -> int:
+        return sum(self.takes.values())
+
+    def ways(self, state) -> int:
+        """ Number of ways to pick the actual elements out of the state's
+        sets, every element of a set being as good as any other """
+        ways = 1
+        for name, count in self.takes.items():
+            ways *= comb(state.size(True, *name), count)
+        return ways
+
+    def __eq__(self, other):
+        return isinstance(other, SubPartition) and \
+            (self.group, self.takes) == (other.group, other.takes)
+
+    def __hash__(self):
+        return hash((self.group, frozenset(self.takes.items())))
+
+    def __repr__(self):
+        return f'SubPartition({self.group}, {self.takes})'
+
+
+def _set_name(group_name: VennSetName) -> VennSetName:
+    if isinstance(group_name, str):
+        return (group_name,)
+    return tuple(sorted(group_name))
+
+
+def get_subpartitions(group_name: VennSetName, state, handsize: int) -> Iterator[SubPartition]:
     """ Gets all valid subpartitions for a group given a graph and size.
-    Will prioritize picking from the subset only it can take from first and
-    build the rest of the combinations off of that. If it can't include
-    all of the elements in the group only it can take from, or
-    if there aren't enough elements outside of that group to fill
-    its hand, then we return an empty list."""
-    
-    # These are the elements that only this group has access to.
-    
-    remainder = handsize - state.size(True, group_name)
-    subset_sizes = sorted(list(state.get_subset_sizes(group_name).items()))
-    print("This is the subset sizes map", subset_sizes)
-    if  remainder < 0: return []
-    if remainder == 0: return [(group_name, handsize)]
-    all_subpartitions = []
-    for change in generate_changes(subset_sizes, remainder, 0, []):
-        change.append((group_name, handsize-remainder))
-        all_subpartitions.append(change)
-    # It would be easy if I could just hash the names of these sets. I need
-    # a good and consistent way to do that. I've been sorting things lexigraphically
-    # and using the string of the concatted group names as the name, but I'm
-    # not sure if that's prone to causing some bugs in the future.
-    # anyways, I want to dynamically get the remaining group names
-    # with the number of items in those groups, and find all possible ways
-    # this group can pick elements from those subgroups without the
-    # remainder going below 0. I think doing this recursively is the best
-    # option.
-
-    return all_subpartitions
-
-def apply_state_changes(option: GraphAction, state: VennGraph):
-    """ Return a new VennGraph with the changes, or just modify
-    the current graph. Let's try that. I just wouldn't want to edit it
-    and have a bug that makes it so that we can't get it back to
-    the original state."""
-    pass
-
-def generate_changes(sizes, hand_size, idx, res):
-    if idx >= len(sizes) and hand_size != 0:
-        return []
-    if idx >= len(sizes) or hand_size == 0:
-        yield res
-        return res
-    for i in range(sizes[idx][1] + 1):
-        changes = generate_changes(sizes, hand_size - i, idx+1, res + [(sizes[idx][0],i)])
-        if changes:
-            yield from changes
+    The group takes everything only it can take from first and fills the
+    rest of its hand from the sets it shares, in every way those sets can
+    cover it. If it can't include all of the elements only it can take
+    from, or there aren't enough shared elements to fill its hand, there
+    are none.
+
+    Works on a VennGraph or a BitmaskVennGraph. The shapes only depend on
+    the shared sets' sizes and the hand size, so they're memoised on those
+    (see Compositions) and the same shapes cost nothing the next time.
+    """
+    own = _set_name(group_name)
+    remainder = handsize - state.size(True, *own)
+    if remainder < 0:
+        return
+    # Every set the group shares, padded with 0s, so (A, C) isn't lost
+    # when (A, B, C) already covers the hand
+    shared = sorted(state.get_subset_sizes(*own).items())
+    names = [name for name, _ in shared]
+    for counts in bounded_compositions([size for _, size in shared], remainder):
+        takes = {own: handsize - remainder}
+        takes.update(zip(names, counts))
+        yield SubPartition(own, takes)
+
+
+def _copy_graph(state):
+    graph = type(state)(*state.parent_sets)
+    for name in state.sets:
+        elements = list(state.get_elements_in_set(*name))
+        if elements:
+            graph.put_in_set(elements, *name)
+    return graph
+
+
+def apply_state_changes(option: SubPartition, state):
+    """ Returns a new graph with the group's hand dealt: the elements it
+    takes are gone and it can't take anything else, so whatever is left
+    in the sets it shared belongs to the other groups in them. The graph
+    passed in is left as it was. """
+    graph = _copy_graph(state)
+    # Which elements go doesn't matter for the counts, see SubPartition.ways
+    for name, count in option.takes.items():
+        graph.remove_from_graph(list(graph.get_elements_in_set(*name))[:count])
+    for name in state.get_sets(*option.group):
+        if name != option.group:
+            graph.remove_from_set(list(graph.get_elements_in_set(*name)), option.group)
+    return graph
+
+
+def count_subpartition_deals(state, hand_sizes: dict[str, int]) -> int:
+    """ Counts the deals of every element in the graph into the groups'
+    hands one group at a time: for each of the first group's subpartitions,
+    its ways times the deals of what's left to the rest. Same number as
+    DealCounter.count_deals on regions_from_graph when the hands take every
+    element. """
+    groups = [group for group in state.parent_sets if group in hand_sizes]
+    if not groups:
+        return int(not any(state.size(True, *name) for name in state.sets))
+    group = groups[0]
+    rest = {other: size for other, size in hand_sizes.items() if other != group}
+    return sum(option.ways(state) *
+               count_subpartition_deals(apply_state_changes(option, state), rest)
+               for option in get_subpartitions(group, state, hand_sizes[group]))
 
 
 print("------------")
 
 for subpartition in get_subpartitions(p1, three_set_venn_diagram, 4):
     print(subpartition)
-
-# Since (A, B, C) comes before (A,C), we don't see the full SubPartition,
-# Need to fix that logic so that we see all of the subsets in the result.
\ No newline at end of file
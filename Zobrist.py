@@ -0,0 +1,115 @@
+""" Zobrist.py
+
+Zobrist hashing of game positions and a fixed size transposition table.
+
+A position hashes to the xor of one random 64 bit key per fact about it:
+the zone (owner mask, 0 once it's out of play) of every tile, which tiles
+we hold, the open ends, the opponents' hand sizes and who's to move. A
+move only changes a few of those facts, so the hash is kept up to date by
+xoring the old keys out and the new ones in instead of hashing the whole
+position again.
+"""
+
+import random
+
+TILE_COUNT = 28
+HAND_COUNT = 3
+MAX_HAND = 7
+
+_rng = random.Random(0x5EED)
+
+
+def _keys(*shape):
+    if len(shape) == 1:
+        return [_rng.getrandbits(64) for _ in range(shape[0])]
+    return [_keys(*shape[1:]) for _ in range(shape[0])]
+
+
+# ZONE_KEYS[tile][owner mask], MINE_KEYS[tile], END_KEYS[side][value + 1]
+# (value -1 for no end yet), HAND_KEYS[hand][size], TURN_KEYS[player]
+ZONE_KEYS = _keys(TILE_COUNT, 1 << HAND_COUNT)
+MINE_KEYS = _keys(TILE_COUNT)
+END_KEYS = _keys(2, 8)
+HAND_KEYS = _keys(HAND_COUNT, MAX_HAND + 1)
+TURN_KEYS = _keys(4)
+
+
+def ends_key(ends) -> int:
+    if not ends:
+        return END_KEYS[0][0] ^ END_KEYS[1][0]
+    return END_KEYS[0][ends[0] + 1] ^ END_KEYS[1][ends[1] + 1]
+
+
+def mine_key(mine: int) -> int:
+    """ The part of a position's hash that comes from the tiles we hold """
+    key = 0
+    while mine:
+        low_bit = mine & -mine
+        mine ^= low_bit
+        key ^= MINE_KEYS[low_bit.bit_length() - 1]
+    return key
+
+
+def position_key(tile_masks, mine: int, ends, hand_sizes, player: int) -> int:
+    """ Full hash of a position, tile_masks[t] being tile t's owner mask """
+    key = ends_key(ends) ^ TURN_KEYS[player]
+    for tile, mask in enumerate(tile_masks):
+        key ^= ZONE_KEYS[tile][mask]
+        if mine >> tile & 1:
+            key ^= MINE_KEYS[tile]
+    for hand, size in enumerate(hand_sizes):
+        key ^= HAND_KEYS[hand][size]
+    return key
+
+
+class TranspositionTable:
+    """ Fixed number of slots indexed by the low bits of the hash
+
+    Each slot keeps the full hash next to its value so collisions on the
+    index are told apart. When two positions want the same slot the one
+    searched deeper wins, unless the one in the slot is left over from an
+    earlier search (see new_search), which always gets replaced.
+    """
+
+    def __init__(self, size_bits: int = 18):
+        self._mask = (1 << size_bits) - 1
+        # slot -> (key, depth, value, generation)
+        self._slots: list[tuple[int, int, float, int] | None] = [None] * (1 << size_bits)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.replacements = 0
+
+    def __len__(self):
+        return sum(1 for slot in self._slots if slot is not None)
+
+    def new_search(self):
+        """ Marks everything stored so far as old, so it makes way for the
+        next search's positions """
+        self.generation += 1
+
+    def get(self, key: int, depth: int) -> float | None:
+        """ Returns the value stored for the position if it was searched at
+        least `depth` plies deep """
+        slot = self._slots[key & self._mask]
+        if slot is not None and slot[0] == key and slot[1] >= depth:
+            self.hits += 1
+            return slot[2]
+        self.misses += 1
+        return None
+
+    def put(self, key: int, depth: int, value: float):
+        index = key & self._mask
+        slot = self._slots[index]
+        if slot is not None and slot[0] != key:
+            if slot[1] > depth and slot[3] == self.generation:
+                return
+            self.replacements += 1
+        self._slots[index] = (key, depth, value, self.generation)
+
+    def clear(self):
+        self._slots = [None] * len(self._slots)
+
+    def __repr__(self):
+        return (f"TranspositionTable(slots={len(self._slots)}, hits={self.hits}, "
+                f"misses={self.misses}, replacements={self.replacements})")
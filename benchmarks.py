@@ -0,0 +1,276 @@
+""" benchmarks.py
+
+Rough timings for the counting code. Run it directly, it just prints tables.
+"""
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Compositions import iter_compositions
+from DealCounter import (DealCounter, IncrementalValueDeals, _dealable, _split_channels,
+                         _value_count, _vector_ops, count_value_deals,
+                         parallel_count_value_deals, region_masks, region_splits)
+from Dominoes import GameState, IncrementalStatistics, _layout
+from Recommender import legal_moves
+
+
+def time_call(func, repeat=5):
+    """ Best wall time of func() over `repeat` runs, in milliseconds """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def random_layout(hand_count, hand_size, passes, rng):
+    """ Deals the tiles out at random, then every pass takes one hand out
+    of the running for a handful of tiles it doesn't hold, like a skip
+    would. Tiles all start out shared by every hand, so the layout is
+    always one a real game could reach. """
+    full_mask = (1 << hand_count) - 1
+    holders = [tile // hand_size for tile in range(hand_count * hand_size)]
+    rng.shuffle(holders)
+    tile_masks = [full_mask] * len(holders)
+    for _ in range(passes):
+        hand = rng.randrange(hand_count)
+        not_held = [tile for tile, holder in enumerate(holders) if holder != hand]
+        for tile in rng.sample(not_held, min(hand_size, len(not_held))):
+            tile_masks[tile] &= ~(1 << hand)
+    regions = {mask: 0 for mask in region_masks(hand_count)}
+    for mask in tile_masks:
+        regions[mask] += 1
+    return regions
+
+
+def bench_hand_count_growth(hand_size=7, passes=6, seed=0):
+    """ How DealCounter's cost grows with the number of unknown hands """
+    rng = random.Random(seed)
+    print(f"{'hands':>5} {'regions':>8} {'used':>5} {'states':>8} {'ms':>10}")
+    for hand_count in range(2, 7):
+        regions = random_layout(hand_count, hand_size, passes, rng)
+        hand_sizes = tuple([hand_size] * hand_count)
+        counter = None
+
+        def run():
+            nonlocal counter
+            counter = DealCounter(regions, hand_count)
+            counter.count(hand_sizes)
+
+        elapsed = time_call(run, repeat=3)
+        used = sum(1 for size in regions.values() if size)
+        print(f"{hand_count:>5} {len(regions):>8} {used:>5} "
+              f"{counter.states():>8} {elapsed:>10.3f}")
+
+
+def bench_parallel_value_deals(hand_count=5, hand_size=7, passes=6, seed=0):
+    """ parallel_count_value_deals against the single process walk, for
+    pools of 1 up to every CPU """
+    rng = random.Random(seed)
+    regions = random_layout(hand_count, hand_size, passes, rng)
+    value_counts = {mask: tuple(min(size, rng.randint(0, 3)) for _ in range(7))
+                    for mask, size in regions.items()}
+    hand_sizes = tuple([hand_size] * hand_count)
+    expected = count_value_deals(regions, value_counts, hand_sizes)
+    serial = time_call(lambda: count_value_deals(regions, value_counts, hand_sizes),
+                       repeat=1)
+    print(f"{'workers':>7} {'ms':>10} {'speedup':>8}")
+    print(f"{'-':>7} {serial:>10.1f} {1:>8.2f}")
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        with ProcessPoolExecutor(workers) as executor:
+            def run():
+                assert parallel_count_value_deals(
+                    regions, value_counts, hand_sizes,
+                    executor=executor, workers=workers) == expected
+
+            elapsed = time_call(run, repeat=1)
+        print(f"{workers:>7} {elapsed:>10.1f} {serial / elapsed:>8.2f}")
+        workers *= 2
+
+
+def random_positions(games=20, seed=0):
+    """ Layouts (region sizes, value counts, hand sizes) of every position
+    of some random games, dealt and played out on GameStates """
+    rng = random.Random(seed)
+    layouts = []
+    for _ in range(games):
+        tiles = list(range(28))
+        rng.shuffle(tiles)
+        hands = [tiles[i * 7:(i + 1) * 7] for i in range(4)]
+        state = GameState.start(sum(1 << tile for tile in hands[0]))
+        passes = 0
+        # Until someone is out or the game is blocked (everyone passed)
+        while state.mine and all(state.hand_sizes) and passes < 4:
+            player = state.current_player()
+            moves = legal_moves(sum(1 << tile for tile in hands[player]), state.ends)
+            if moves:
+                tile, left = rng.choice(moves)
+                hands[player].remove(tile)
+                state = state.play(tile, left)
+                passes = 0
+            else:
+                state = state.passed()
+                passes += 1
+            layouts.append(_layout(state.signature()))
+    return layouts
+
+
+def unplanned_count_value_deals(region_sizes, value_counts, hand_sizes):
+    """ count_value_deals as it was before the walk planned its regions,
+    kept as the baseline for bench_value_deals_plan """
+    hand_count = len(hand_sizes)
+    value_count = _value_count(value_counts)
+    channels = 1 + hand_count * value_count
+    zero, multiply_add, as_vector = _vector_ops("exact", channels)
+    counter = DealCounter(region_sizes, hand_count)
+    if not _dealable(counter, hand_sizes):
+        return _split_channels(zero(), hand_count, value_count)
+    table = {tuple([0] * hand_count): as_vector([1] * channels)}
+    for k, (mask, size, owners) in enumerate(counter.regions):
+        values = value_counts.get(mask, ())
+        capacity = counter.capacity_after[k]
+        weights = {}
+        next_table = {}
+        for filled, counts in table.items():
+            room = [hand_sizes[i] - filled[i] for i in owners]
+            for split, ways in region_splits(size, room):
+                new_filled = list(filled)
+                for i, x in zip(owners, split):
+                    new_filled[i] += x
+                needed = [need - got for need, got in zip(hand_sizes, new_filled)]
+                if any(need > cap for need, cap in zip(needed, capacity)) or \
+                        sum(needed) > counter.tiles_after[k]:
+                    continue
+                if split not in weights:
+                    weight = [ways] * channels
+                    for i, x in zip(owners, split):
+                        for v, with_value in enumerate(values):
+                            weight[1 + i * value_count + v] = \
+                                ways * math.comb(size - with_value, x) // math.comb(size, x)
+                    weights[split] = as_vector(weight)
+                new_filled = tuple(new_filled)
+                next_table[new_filled] = multiply_add(
+                    next_table[new_filled] if new_filled in next_table else zero(),
+                    counts, weights[split])
+        table = next_table
+    return _split_channels(table.get(tuple(hand_sizes), zero()), hand_count, value_count)
+
+
+def bench_value_deals_plan(games=20, seed=0):
+    """ count_value_deals with its regions planned against the baseline,
+    over every position of some random games """
+    layouts = random_positions(games, seed)
+    assert all(count_value_deals(*layout) == unplanned_count_value_deals(*layout)
+               for layout in layouts)
+    print(f"{'walk':>10} {'positions':>10} {'ms':>10} {'us/pos':>8}")
+    for name, func in (("unplanned", unplanned_count_value_deals),
+                       ("planned", count_value_deals)):
+        elapsed = time_call(lambda: [func(*layout) for layout in layouts], repeat=3)
+        print(f"{name:>10} {len(layouts):>10} {elapsed:>10.1f} "
+              f"{1000 * elapsed / len(layouts):>8.1f}")
+
+
+def bench_incremental_value_deals(games=20, seed=0):
+    """ IncrementalValueDeals following every position of some random
+    games against a fresh count_value_deals for each, with and without
+    the zone make-ups """
+    layouts = random_positions(games, seed)
+    print(f"{'zones':>6} {'walk':>12} {'positions':>10} {'ms':>10} {'us/pos':>8}")
+    for with_zones in (False, True):
+        def fresh():
+            return [count_value_deals(*layout, with_zones=with_zones) for layout in layouts]
+
+        def incremental():
+            deals = IncrementalValueDeals(IncrementalStatistics._ORDER, 3)
+            return [deals.count(*layout, with_zones=with_zones) for layout in layouts]
+
+        assert fresh() == incremental()
+        for name, func in (("fresh", fresh), ("incremental", incremental)):
+            elapsed = time_call(func, repeat=5)
+            print(f"{str(with_zones):>6} {name:>12} {len(layouts):>10} {elapsed:>10.1f} "
+                  f"{1000 * elapsed / len(layouts):>8.1f}")
+
+
+def recursive_iter(sizes, hand_size, idx, res):
+    """ dicRefPython.recursive_iter as it was, kept as a baseline for
+    bench_compositions """
+    if idx >= len(sizes) and hand_size != 0:
+        return []
+    if idx >= len(sizes) or hand_size == 0:
+        yield res
+        return res
+    for i in range(sizes[idx] + 1):
+        results = recursive_iter(sizes, hand_size - i, idx+1, res + [i])
+        if results:
+            yield from results
+
+
+def generate_changes(sizes, hand_size, idx, res):
+    """ ThreeEventStats.generate_changes as it was, (name, size) pairs in
+    and (name, taken) lists out """
+    if idx >= len(sizes) and hand_size != 0:
+        return []
+    if idx >= len(sizes) or hand_size == 0:
+        yield res
+        return res
+    for i in range(sizes[idx][1] + 1):
+        changes = generate_changes(sizes, hand_size - i, idx+1, res + [(sizes[idx][0], i)])
+        if changes:
+            yield from changes
+
+
+def bench_compositions(repeat=3):
+    """ iter_compositions against the recursive enumerators it replaced,
+    walking every result once. The recursive ones try every prefix, even
+    the ones already past the total, and deep inputs run them out of
+    stack. """
+    cases = (("4 sets", [1, 2, 3, 4], 4),
+             ("3 hands", [4, 3, 3, 5, 6, 2], 7),
+             ("4 hands", [3, 2, 2, 1, 3, 2, 1, 2, 1, 3], 7),
+             ("deep", [0] * 3000 + [1], 1))
+    walks = (("recursive_iter", lambda sizes, total: recursive_iter(sizes, total, 0, [])),
+             ("generate_changes", lambda sizes, total: generate_changes(
+                 [(i, size) for i, size in enumerate(sizes)], total, 0, [])),
+             ("iterative", iter_compositions))
+    print(f"{'case':>8} {'results':>8} " + " ".join(f"{name + ' ms':>19}" for name, _ in walks))
+    for case, sizes, total in cases:
+        results = sum(1 for _ in iter_compositions(sizes, total))
+        timings = []
+        for name, walk in walks:
+            def run():
+                found = 0
+                for _ in walk(sizes, total):
+                    found += 1
+                assert found == results
+            try:
+                timings.append(f"{time_call(run, repeat):>19.2f}")
+            except RecursionError:
+                timings.append(f"{'stack overflow':>19}")
+        print(f"{case:>8} {results:>8} " + " ".join(timings))
+
+
+def main():
+    print("DealCounter cost by number of hands")
+    bench_hand_count_growth()
+    print()
+    print("Value counts over a process pool")
+    bench_parallel_value_deals()
+    print()
+    print("Value counts with and without the region plan")
+    bench_value_deals_plan()
+    print()
+    print("Value counts followed move by move, against counting afresh")
+    bench_incremental_value_deals()
+    print()
+    print("Bounded compositions, recursive against iterative")
+    bench_compositions()
+
+
+if __name__ == "__main__":
+    main()
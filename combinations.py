@@ -1,5 +1,5 @@
 from itertools import combinations, product
-import math
+from Binomials import comb
 
 S1 = set([1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20])
 S2 = set([8,9,10,11,12,13,14,15,16,17])
@@ -34,9 +34,9 @@ def count_non_overlapping_combinations_3hands(size_s1, size_s2, size_s3, size_h1
                 if remaining_h1 < 0 or remaining_h2 < 0 or remaining_h3 < 0:
                     continue
 
-                combinations_h1 = math.comb(size_intersection_12, i) * math.comb(size_intersection_13, j) * math.comb(non_intersect_s1, remaining_h1)
-                combinations_h2 = math.comb(size_intersection_12, i) * math.comb(size_intersection_23, k) * math.comb(non_intersect_s2, remaining_h2)
-                combinations_h3 = math.comb(size_intersection_13, j) * math.comb(size_intersection_23, k) * math.comb(non_intersect_s3, remaining_h3)
+                combinations_h1 = comb(size_intersection_12, i) * comb(size_intersection_13, j) * comb(non_intersect_s1, remaining_h1)
+                combinations_h2 = comb(size_intersection_12, i) * comb(size_intersection_23, k) * comb(non_intersect_s2, remaining_h2)
+                combinations_h3 = comb(size_intersection_13, j) * comb(size_intersection_23, k) * comb(non_intersect_s3, remaining_h3)
 
                 total_count += combinations_h1 * combinations_h2 * combinations_h3
 
@@ -53,9 +53,9 @@ def count_non_overlapping_combinations(size_s1, size_s2, size_h1, size_h2, size_
         if remaining_h1 > non_intersect_s1 or available_h2 < size_h2:
             continue
 
-        combinations_h1 = math.comb(size_intersection, i)
-        combinations_non_intersect_s1 = math.comb(non_intersect_s1, remaining_h1)
-        combinations_h2 = math.comb(available_h2, size_h2)
+        combinations_h1 = comb(size_intersection, i)
+        combinations_non_intersect_s1 = comb(non_intersect_s1, remaining_h1)
+        combinations_h2 = comb(available_h2, size_h2)
 
         total_count += combinations_h1 * combinations_non_intersect_s1 * combinations_h2
 
@@ -1,6 +1,7 @@
 from itertools import combinations, product
 from enum import Enum
-import math
+
+from DealCounter import count_deals
 
 # S1 = set([1,2,3,4,5,11,12,13,14])
 # S2 = set([2,3,4,5,6,7,8,9,10])
@@ -148,39 +149,13 @@ def count_non_overlapping_combinations_3hands2(size_s1, size_s2, size_s3, size_h
     strict_intersect_13 = intersection_13 - intersection_123
     strict_intersect_23 = intersection_23 - intersection_123
     print(f'{strict_intersect_12=} {strict_intersect_13=} {strict_intersect_23=} {intersection_123=} {non_intersect_s3=}')
-    total_count = 0
-
-    for h1_i_12 in range(strict_intersect_12 + 1):
-        for h1_i_13 in range(strict_intersect_13 + 1):
-            for h1_i_123 in range(intersection_123 + 1):
-                remaining_h1 = size_h1 - h1_i_12 - h1_i_13 - h1_i_123
-                if remaining_h1 < 0 or remaining_h1 > non_intersect_s1: # can cut the loops down by breaking when remaining < 0 and continuing on other condition
-                    continue
-                for h2_j_12 in range(strict_intersect_12 - h1_i_12 + 1):
-                    for h2_j_23 in range(strict_intersect_23 + 1):
-                        for h2_j_123 in range(intersection_123 - h1_i_123 + 1):
-                            remaining_h2 = size_h2 - h2_j_12 - h2_j_23 - h2_j_123
-                            if remaining_h2 < 0 or remaining_h2 > non_intersect_s2:
-                                continue
-
-                            if size_h3 > size_s3 - h2_j_23 - h1_i_13 - h1_i_123 - h2_j_123:
-                                continue
-
-                            combinations_h1 = max(math.comb(strict_intersect_12, h1_i_12), 1) * max(math.comb(strict_intersect_13, h1_i_13), 1) * max(math.comb(intersection_123, h1_i_123), 1) * max(math.comb(non_intersect_s1, remaining_h1), 1)
-                            combinations_h2 = max(math.comb(strict_intersect_12 - h1_i_12, h2_j_12), 1) * max(math.comb(strict_intersect_23, h2_j_23), 1) * max(math.comb(intersection_123 - h1_i_123, h2_j_123), 1) * max(math.comb(non_intersect_s2, remaining_h2), 1)
-                            combinations_h3 = max(math.comb(size_s3 - h2_j_23 - h1_i_13 - h1_i_123 - h2_j_123, size_h3), 1)
-                            count = combinations_h1 * combinations_h2 * combinations_h3
-                            h3_k_13 = strict_intersect_13 - h1_i_13
-                            h3_k_23 = strict_intersect_23 - h2_j_23
-                            h3_k_123 = intersection_123 - h2_j_123 - h1_i_123
-                            remaining_h3 = size_h3 - h3_k_13 - h3_k_23 - h3_k_123
-                            if debug:
-                                print(f'1/2-{h1_i_12} 1/3-{h1_i_13} 1/2/3-{h1_i_123}, 1-{remaining_h1}')
-                                print(f'1/2-{h2_j_12} 2/3-{h2_j_23} 1/2/3-{h2_j_123} 2-{remaining_h2}')
-                                print(f'1/3-{h3_k_13} 2/3-{h3_k_23} 1/2/3-{h3_k_123} 3-{remaining_h3}')
-                                print(count)
-                                print("==============")
-                            total_count += count
+    total_count = count_deals({0b001: non_intersect_s1, 0b010: non_intersect_s2, 0b100: non_intersect_s3,
+                               0b011: strict_intersect_12, 0b101: strict_intersect_13, 0b110: strict_intersect_23,
+                               0b111: intersection_123},
+                              (size_h1, size_h2, size_h3))
+    if debug:
+        print(total_count)
+        print("==============")
     return total_count
 
 debug = True
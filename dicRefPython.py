@@ -1,3 +1,6 @@
+from Compositions import bounded_compositions
+
+
 class Foo:
     def __init__(self, name):
         self.name = name
@@ -46,20 +49,14 @@ one user can take from the subsets available to them.
 """
 
 
-def recursive_iter(sizes, hand_size, idx, res):
-    if idx >= len(sizes) and hand_size != 0:
-        return []
-    if idx >= len(sizes) or hand_size == 0:
-        yield res
-        return res
-    for i in range(sizes[idx] + 1):
-        results = recursive_iter(sizes, hand_size - i, idx+1, res + [i])
-        if results:
-            yield from results
+# recursive_iter grew into Compositions.bounded_compositions, which pads
+# every result to the same length and is memoised on (sizes, hand size).
+def recursive_iter(sizes, hand_size):
+    yield from bounded_compositions(sizes, hand_size)
 
 
-for res in recursive_iter(thing_sizes, 4, 0, []):
-    print(res)
+for res in recursive_iter(thing_sizes, 4):
+    print(list(res))
 
 """This returns this:
 [0, 0, 0, 4]
@@ -83,6 +80,9 @@ for res in recursive_iter(thing_sizes, 4, 0, []):
 [1, 2, 0, 1]
 [1, 2, 1]
 
+(That was the old recursive version. It stopped as soon as the hand was
+full, so some results came out short. Now every one gets padded with 0s,
+e.g. [0, 1, 3, 0] and [1, 2, 1, 0].)
 
 
 So for the list [1,2,3,4]
@@ -118,5 +118,5 @@ Having this will let us work with any number of players instead of a fixed 3.
 
 print("======== 8 person game")
 eight_person_game = [5, 4, 3, 2, 3, 2, 4, 3, 2, 4, 3, 2, 4, 5]
-for res in recursive_iter(eight_person_game, 7, 0, []):
-    print(res)
+for res in recursive_iter(eight_person_game, 7):
+    print(list(res))
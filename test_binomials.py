@@ -0,0 +1,46 @@
+import math
+import sys
+import threading
+import unittest
+
+import Binomials
+
+
+class BinomialsTest(unittest.TestCase):
+    def test_matches_math_comb(self):
+        for n in range(60):
+            for x in range(n + 2):
+                self.assertEqual(Binomials.comb(n, x), math.comb(n, x))
+        self.assertAlmostEqual(Binomials.log_comb(50, 20), math.log(math.comb(50, 20)))
+
+    def test_threads_growing_the_triangle_at_once(self):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for _ in range(50):
+                Binomials._rows[1:] = []
+                Binomials._log_rows[1:] = []
+                start = threading.Barrier(8)
+                failures = []
+
+                def grow(offset):
+                    start.wait()
+                    for n in range(offset, 120, 7):
+                        if Binomials.row(n) != [math.comb(n, x) for x in range(n + 1)]:
+                            failures.append(n)
+                        if Binomials.log_row(n)[n // 2] != math.log(math.comb(n, n // 2)):
+                            failures.append(n)
+
+                threads = [threading.Thread(target=grow, args=(i,)) for i in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(failures, [])
+                self.assertEqual(len(Binomials._rows), len(set(map(len, Binomials._rows))))
+        finally:
+            sys.setswitchinterval(interval)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import itertools
+import math
+import random
+import unittest
+from unittest import mock
+
+import DealCounter
+from DealCounter import LOG_RELATIVE_ERROR, count_deals, count_value_deals, region_masks
+from DealEnumerator import DealEnumerator
+
+
+def double_twelve_layout(hand_size, seed):
+    """ Every double twelve tile in a random region, three hands of
+    hand_size and the rest left over """
+    rng = random.Random(seed)
+    region_sizes = {mask: 0 for mask in region_masks(3)}
+    value_counts = {mask: [0] * 13 for mask in region_masks(3)}
+    for a in range(13):
+        for b in range(a, 13):
+            mask = rng.choice(region_masks(3))
+            region_sizes[mask] += 1
+            for value in {a, b}:
+                value_counts[mask][value] += 1
+    return (region_sizes, {mask: tuple(counts) for mask, counts in value_counts.items()},
+            (hand_size,) * 3)
+
+
+def small_layout(hand_count, rng):
+    """ A few tiles in random regions (tile bitmasks) and hand sizes that
+    leave some of them over now and then """
+    region_tiles = dict.fromkeys(region_masks(hand_count), 0)
+    tiles = rng.randint(0, 6)
+    for tile in range(tiles):
+        region_tiles[rng.choice(region_masks(hand_count))] |= 1 << tile
+    hand_sizes = [0] * hand_count
+    for _ in range(tiles - rng.randint(0, 2)):
+        hand_sizes[rng.randrange(hand_count)] += 1
+    return region_tiles, tuple(hand_sizes)
+
+
+def every_deal(region_tiles, hand_sizes):
+    """ Every deal by brute force: each tile goes to one of the hands that
+    can hold it or is left over """
+    choices = [[None] + [i for i in range(len(hand_sizes)) if mask >> i & 1]
+               for mask, tiles in region_tiles.items() for _ in range(tiles.bit_count())]
+    tile_bits = [1 << tile for tiles in region_tiles.values() for tile in range(tiles.bit_length())
+                 if tiles >> tile & 1]
+    deals = set()
+    for owners in itertools.product(*choices):
+        deal = [0] * len(hand_sizes)
+        for bit, owner in zip(tile_bits, owners):
+            if owner is not None:
+                deal[owner] |= bit
+        if tuple(hand.bit_count() for hand in deal) == hand_sizes:
+            deals.add(tuple(deal))
+    return deals
+
+
+def flatten(result):
+    """ count_value_deals(..., with_zones=True) -> (key, count) pairs """
+    total, avoided, held = result
+    yield "total", total
+    for i, counts in enumerate(avoided):
+        for v, count in enumerate(counts):
+            yield ("avoided", i, v), count
+    for mask, hands in held.items():
+        for i, counts in hands.items():
+            for x, count in counts.items():
+                yield ("held", mask, i, x), count
+
+
+class CountDealsTest(unittest.TestCase):
+    def test_count_deals_matches_the_enumerated_deals(self):
+        rng = random.Random(0)
+        for hand_count in (1, 2, 3, 4):
+            for _ in range(40):
+                region_tiles, hand_sizes = small_layout(hand_count, rng)
+                region_sizes = {mask: tiles.bit_count() for mask, tiles in region_tiles.items()}
+                with self.subTest(region_sizes=region_sizes, hand_sizes=hand_sizes):
+                    deals = list(DealEnumerator(region_tiles, hand_sizes))
+                    self.assertEqual(set(deals), every_deal(region_tiles, hand_sizes))
+                    self.assertEqual(len(set(deals)), len(deals))
+                    self.assertEqual(count_deals(region_sizes, hand_sizes), len(deals))
+                    if deals:
+                        self.assertAlmostEqual(count_deals(region_sizes, hand_sizes, "float"),
+                                               len(deals), delta=1e-9 * len(deals))
+                        self.assertAlmostEqual(count_deals(region_sizes, hand_sizes, "log"),
+                                               math.log(len(deals)), delta=1e-9)
+
+
+class PrecisionTest(unittest.TestCase):
+    def assertCloseTo(self, exact, got, precision):
+        self.assertEqual(exact.keys(), got.keys())
+        for key, count in exact.items():
+            if precision == "log":
+                if not count:
+                    self.assertEqual(got[key], -math.inf, key)
+                    continue
+                got_count = math.exp(got[key] - math.log(count))
+            else:
+                got_count = got[key] / count if count else got[key] + 1
+            self.assertAlmostEqual(got_count, 1, delta=LOG_RELATIVE_ERROR, msg=key)
+
+    def test_float_and_log_match_exact(self):
+        for seed in range(3):
+            layout = double_twelve_layout(8, seed)
+            exact = dict(flatten(count_value_deals(*layout, with_zones=True)))
+            for precision in ("float", "log"):
+                with self.subTest(seed=seed, precision=precision):
+                    got = dict(flatten(count_value_deals(*layout, precision, with_zones=True)))
+                    self.assertCloseTo(exact, got, precision)
+
+    def test_log_counts_without_exact_binomials(self):
+        def exact_work(*args, **kwargs):
+            raise AssertionError("log precision worked with exact counts")
+
+        layout = double_twelve_layout(8, 0)
+        with mock.patch.object(DealCounter, "row", exact_work), \
+                mock.patch.object(DealCounter.DealCounter, "completions", exact_work):
+            total, _, _ = count_value_deals(*layout, "log", with_zones=True)
+        self.assertGreater(total, 0)
+
+    def test_log_handles_counts_past_float_range(self):
+        # 900 tiles anyone can hold dealt into three hands of 300 is about
+        # 10^426 deals, well past the largest float
+        for size, hand in ((150, 50), (900, 300)):
+            with self.subTest(size=size):
+                total, _ = count_value_deals({0b111: size}, {}, (hand,) * 3, "log")
+                exact = math.comb(size, hand) * math.comb(size - hand, hand)
+                self.assertAlmostEqual(total, math.log(exact),
+                                       delta=LOG_RELATIVE_ERROR * math.log(exact))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import DealTable
+from DealCounter import count_deals
+from DealTable import ZONE_ORDER, build_table
+
+
+def random_layouts(max_hand, count, seed):
+    """ (region sizes, hand sizes) with every unknown domino in a hand """
+    rng = random.Random(seed)
+    for _ in range(count):
+        hand_sizes = tuple(rng.randint(0, max_hand) for _ in range(3))
+        region_sizes = dict.fromkeys(ZONE_ORDER, 0)
+        for _ in range(sum(hand_sizes)):
+            region_sizes[rng.choice(ZONE_ORDER)] += 1
+        yield region_sizes, hand_sizes
+
+
+class DealTableTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "deal_table.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_built_table_matches_count_deals(self):
+        build_table(self.path, max_hand=3)
+        with DealTable.DealTable(self.path) as table, \
+                mock.patch.object(DealTable, "count_deals") as counted:
+            for region_sizes, hand_sizes in random_layouts(3, 200, 0):
+                with self.subTest(region_sizes=region_sizes, hand_sizes=hand_sizes):
+                    self.assertEqual(table.lookup(region_sizes, hand_sizes),
+                                     count_deals(region_sizes, hand_sizes))
+            counted.assert_not_called()
+
+    def test_empty_table_counts_on_lookup_and_keeps_the_counts(self):
+        layouts = list(random_layouts(4, 200, 1))
+        with DealTable.DealTable(self.path, max_hand=4) as table:
+            for region_sizes, hand_sizes in layouts:
+                self.assertEqual(table.lookup(region_sizes, hand_sizes),
+                                 count_deals(region_sizes, hand_sizes))
+        # Only the header and the pages that were written take up disk
+        self.assertLess(os.stat(self.path).st_blocks * 512, os.path.getsize(self.path))
+        with DealTable.DealTable(self.path) as table, \
+                mock.patch.object(DealTable, "count_deals") as counted:
+            self.assertEqual(table.max_hand, 4)
+            for region_sizes, hand_sizes in layouts:
+                self.assertEqual(table.lookup(region_sizes, hand_sizes),
+                                 count_deals(region_sizes, hand_sizes))
+            counted.assert_not_called()
+
+    def test_layouts_it_does_not_cover(self):
+        with DealTable.DealTable(self.path, max_hand=2) as table:
+            self.assertIsNone(table.lookup({0b111: 9}, (3, 3, 3)))
+            # A domino left over
+            self.assertIsNone(table.lookup({0b111: 4}, (1, 1, 1)))
+            self.assertEqual(table.lookup({0b001: 3}, (1, 1, 1)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import random
+import unittest
+
+import Dominoes
+from Recommender import legal_moves
+from test_statistics import play_random_game
+from Zobrist import position_key
+
+
+def hand_sizes(game):
+    return {player: game._players_state._all_players[player].hand_size
+            for player in Dominoes._PLAYER_BITS}
+
+
+class PropagateTest(unittest.TestCase):
+    def test_propagate_keeps_the_counts(self):
+        shifted = 0
+        for seed in range(6):
+            game = Dominoes.Game(propagate=False)
+
+            def check():
+                nonlocal shifted
+                before = Dominoes.Statistics(game._zones_state, game._players_state)
+                propagated = game.copy()
+                moves = []
+                propagated._zones_state.subscribe(
+                    lambda domino, old_zone, new_zone: moves.append(old_zone != new_zone))
+                result = propagated._zones_state.propagate(hand_sizes(propagated))
+                after = Dominoes.Statistics(propagated._zones_state,
+                                            propagated._players_state)
+                with self.subTest(seed=seed, round=game._round):
+                    self.assertEqual(after.count_value_combinations(),
+                                     before.count_value_combinations())
+                    self.assertEqual(result, len(moves))
+                    self.assertTrue(all(moves))
+                    # Nothing left to pin down
+                    self.assertEqual(propagated._zones_state.propagate(hand_sizes(propagated)), 0)
+                shifted += result
+
+            play_random_game(game, seed, check)
+        # Some position had something to pin down
+        self.assertGreater(shifted, 0)
+
+    def test_shift_reports_whether_the_domino_moved(self):
+        game = Dominoes.Game()
+        zones = game._zones_state
+        domino = game._dominoes_state._all_dominoes[0]
+        self.assertTrue(zones.shift(domino, Dominoes._Player.PLAYER_1))
+        self.assertFalse(zones.shift(domino, Dominoes._Player.PLAYER_1))
+        self.assertEqual(zones._domino_to_zone[domino], Dominoes._Zone.ZONE_23)
+
+
+class ZobristTest(unittest.TestCase):
+    def test_game_state_key_matches_a_fresh_hash(self):
+        checked = 0
+        for seed in range(20):
+            rng = random.Random(seed)
+            tiles = list(range(28))
+            rng.shuffle(tiles)
+            hands = [sum(1 << tile for tile in tiles[i * 7:(i + 1) * 7]) for i in range(4)]
+            state = Dominoes.GameState.start(hands[0])
+            passes = 0
+            # Until someone is out or the game is blocked (everyone passed)
+            while state.mine and all(state.hand_sizes) and passes < 4:
+                player = state.current_player()
+                moves = legal_moves(hands[player], state.ends)
+                if moves:
+                    tile, left = rng.choice(moves)
+                    hands[player] &= ~(1 << tile)
+                    state = state.play(tile, left)
+                    passes = 0
+                else:
+                    state = state.passed()
+                    passes += 1
+                with self.subTest(seed=seed, round=state.round):
+                    self.assertEqual(state.key, state._with_key().key)
+                checked += 1
+        self.assertGreater(checked, 0)
+
+    def test_pass_on_other_numbers(self):
+        state = Dominoes.GameState.start(0b1111111).play(0)
+        passed = state.passed([3, 5])
+        self.assertEqual(passed.key, passed._with_key().key)
+        self.assertNotEqual(passed.key, state.passed([]).key)
+
+    def test_game_key_matches_a_fresh_hash(self):
+        checked = 0
+        for seed in range(4):
+            game = Dominoes.Game()
+
+            def check():
+                nonlocal checked
+                checked += 1
+                dominoes = game._dominoes_state._all_dominoes
+                zones = game._zones_state._domino_to_zone
+                masks = [Dominoes._ZONE_MASKS[zones[domino]] if zones[domino] else 0
+                         for domino in dominoes]
+                with self.subTest(seed=seed, round=game._round):
+                    self.assertEqual(game.key, position_key(
+                        masks, 0, game._dominoes_state.active_ends,
+                        game._opponent_hand_sizes(), game._round % 4))
+                    self.assertEqual(game.key, Dominoes.GameState.from_game(game).key)
+
+            play_random_game(game, seed, check)
+        self.assertGreater(checked, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import DealCounter
+import Dominoes
+from DealTable import DealTable, build_table
+from Dominoes import _layout
+from StatsCache import StatsCache
+
+
+def play_random_game(game, seed, on_move):
+    """ Plays a game where every hand is dealt up front, so every position
+    is one the zones can actually be in, calling on_move after each move """
+    rng = random.Random(seed)
+    dominoes = game._dominoes_state._all_dominoes
+    ours = [0, 7, 13, 18, 22, 25, 27]
+    rest = [i for i in range(28) if i not in ours]
+    rng.shuffle(rest)
+    hands = [ours, rest[0:7], rest[7:14], rest[14:21]]
+    with contextlib.redirect_stdout(io.StringIO()):
+        game.assignToP0(ours)
+        while all(hands):
+            player = game._round % 4
+            ends = game._dominoes_state.active_ends
+            playable = [i for i in hands[player]
+                        if not ends or dominoes[i].has(ends[0]) or dominoes[i].has(ends[1])]
+            if not playable:
+                game.player_passed(sorted(set(ends)))
+            else:
+                i = rng.choice(playable)
+                hands[player].remove(i)
+                if not ends or dominoes[i].has(ends[0]):
+                    game.play_left(dominoes[i])
+                else:
+                    game.play_right(dominoes[i])
+            on_move()
+
+
+class StatisticsBackendsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Small hands only, so it builds in a moment and the late positions
+        # are answered from it while the early ones fall back to counting
+        handle, cls.table_path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+        build_table(cls.table_path, max_hand=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.table_path)
+
+    def test_backends_count_without_a_full_count_value_deals(self):
+        def full_count(*args, **kwargs):
+            raise AssertionError("fell back to a full count_value_deals call")
+
+        covered_positions = 0
+        with DealTable(self.table_path) as table, ThreadPoolExecutor(2) as executor:
+            for seed in range(3):
+                game = Dominoes.Game()
+                incremental = Dominoes.IncrementalStatistics(game._zones_state,
+                                                             game._players_state)
+
+                def check():
+                    nonlocal covered_positions
+                    zones, players = game._zones_state, game._players_state
+                    fresh = Dominoes.Statistics(zones, players)
+                    expected = fresh.calculate_probabilities()
+                    expected_counts, _ = fresh.count_value_combinations()
+                    backends = {
+                        "incremental": incremental,
+                        "table": Dominoes.Statistics(zones, players, table=table),
+                        "executor": Dominoes.Statistics(zones, players, executor=executor),
+                    }
+                    region_sizes, _, hand_sizes = _layout(backends["table"].signature())
+                    covered = table.lookup(region_sizes, hand_sizes) is not None
+                    covered_positions += covered
+                    with mock.patch.object(Dominoes, "count_value_deals", full_count), \
+                            mock.patch.object(DealCounter, "count_value_deals", full_count):
+                        for name, stats in backends.items():
+                            if name == "table" and not covered:
+                                continue
+                            with self.subTest(seed=seed, backend=name):
+                                self.assertEqual(stats.count_value_combinations(),
+                                                 (expected_counts, expected.total))
+                                if name != "table":
+                                    self.assertEqual(stats.calculate_probabilities(), expected)
+                    # The table has no zone make-ups, so those and the
+                    # layouts it doesn't cover come out of the one pass
+                    with self.subTest(seed=seed, backend="table"):
+                        table_stats = Dominoes.Statistics(zones, players, table=table)
+                        self.assertEqual(table_stats.count_value_combinations(),
+                                         (expected_counts, expected.total))
+                        self.assertEqual(table_stats.calculate_probabilities(), expected)
+
+                play_random_game(game, seed, check)
+        # Some of the positions were answered from the table
+        self.assertGreater(covered_positions, 0)
+
+    def test_zones_and_counts_share_the_cache(self):
+        game = Dominoes.Game()
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.assignToP0([0, 7, 13, 18, 22, 25, 27])
+        cache = StatsCache()
+        stats = Dominoes.Statistics(game._zones_state, game._players_state, cache=cache)
+        result = stats.calculate_probabilities()
+        with mock.patch.object(Dominoes, "count_value_deals") as count:
+            self.assertEqual(stats.calculate_probabilities(), result)
+            final_stats, total = stats.count_value_combinations()
+            count.assert_not_called()
+        self.assertEqual(total, result.total)
+
+
+if __name__ == "__main__":
+    unittest.main()